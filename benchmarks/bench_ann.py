@@ -0,0 +1,70 @@
+"""IVF approximate KNN against exact KNN: query time, recall and accuracy.
+
+Usage::
+
+    python -m benchmarks.bench_ann loan_data_2007_2014.csv --n-probe 4 8 16
+
+Uses the notebook's split of ``final_loan_data``. Recall is the share of
+the exact 5 nearest neighbours (on the same standardized features) that the
+index returns. The notebook's unscaled ``KNeighborsClassifier()`` is listed
+for reference.
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+from credit_risk.ann import IVFKNeighborsClassifier, fit_standardizer, standardize
+from credit_risk.cache import load_features
+from credit_risk.pipeline import risk_target
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--queries", type=int, default=20_000,
+                        help="validation rows to score (exact KNN is slow)")
+    args = parser.parse_args(argv)
+
+    final_loan_data, loan_risk_est = load_features(args.path)
+    train_X, val_X, train_y, val_y = train_test_split(
+        final_loan_data.to_numpy(), risk_target(loan_risk_est), random_state=0
+    )
+    val_X, val_y = val_X[:args.queries], val_y[:args.queries]
+    print(f"{len(train_X)} training rows, {len(val_X)} queries")
+    print(f"{'model':<28} {'fit (s)':>8} {'query (s)':>10} {'recall':>7} {'accuracy':>9}")
+
+    notebook = KNeighborsClassifier().fit(train_X, train_y)
+    predict_y, query_s = timed(notebook.predict, val_X)
+    print(f"{'exact, unscaled (notebook)':<28} {'':>8} {query_s:>10.2f} {'':>7} "
+          f"{accuracy_score(val_y, predict_y):>9.4f}")
+
+    # Exact search on the features the index sees
+    mean, scale = fit_standardizer(train_X)
+    exact = KNeighborsClassifier().fit(standardize(train_X, mean, scale), train_y)
+    (_, exact_idx), query_s = timed(exact.kneighbors, standardize(val_X, mean, scale))
+    exact_y = exact.predict(standardize(val_X, mean, scale))
+    print(f"{'exact, standardized':<28} {'':>8} {query_s:>10.2f} {1:>7.3f} "
+          f"{accuracy_score(val_y, exact_y):>9.4f}")
+
+    for n_probe in args.n_probe:
+        model, fit_s = timed(IVFKNeighborsClassifier(n_probe=n_probe).fit, train_X, train_y)
+        (_, idx), query_s = timed(model.kneighbors, val_X)
+        recall = np.mean([len(np.intersect1d(a, b)) / len(a) for a, b in zip(exact_idx, idx)])
+        predict_y = model.predict(val_X)
+        print(f"{f'IVF, n_probe={n_probe}':<28} {fit_s:>8.2f} {query_s:>10.2f} "
+              f"{recall:>7.3f} {accuracy_score(val_y, predict_y):>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
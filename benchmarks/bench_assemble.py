@@ -0,0 +1,76 @@
+"""Peak memory of assembling final_loan_data: concat chain vs. one matrix.
+
+Usage::
+
+    python -m benchmarks.bench_assemble loan_data_2007_2014.csv
+
+Starting from the cleaned loans, builds ``final_loan_data`` the notebook's
+way (ordinal maps, ``pd.get_dummies``, ``drop`` + ``pd.concat`` of the
+categorical block, then ``pd.concat`` with the imputed numeric block) and
+with ``FeaturePipeline.transform_matrix``. Both use the same fitted encoder
+vocabulary and a median imputer, so only the assembly differs. Peak memory
+is measured with tracemalloc and reported relative to the size of a
+float32 ``final_loan_data``.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.impute import Imputer
+from credit_risk.loader import load_loan_data
+from credit_risk.pipeline import DUMMY_FIELDS, NAN_COLS, NUM_COLS, ORDINAL_FIELDS, FeaturePipeline
+from credit_risk.transforms import clean_chunk
+
+
+def notebook_assembly(nnc_loan_data, imputer):
+    cat_loan_data = nnc_loan_data[["term"] + ORDINAL_FIELDS + ["initial_list_status"]
+                                  + DUMMY_FIELDS].copy()
+    for field in ORDINAL_FIELDS:
+        values = sorted(cat_loan_data[field].dropna().unique())
+        cat_loan_data[field] = cat_loan_data[field].map(
+            {item: i for i, item in enumerate(values, 1)}
+        ).astype("int64")
+    dummies = pd.get_dummies(cat_loan_data[DUMMY_FIELDS])
+    cat_loan_data = pd.concat([cat_loan_data.drop(DUMMY_FIELDS, axis=1), dummies], axis=1)
+
+    num_loan_data = nnc_loan_data[NUM_COLS].copy()
+    num_loan_data[NAN_COLS] = imputer.transform(nnc_loan_data)
+    return pd.concat([cat_loan_data, num_loan_data], axis=1)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    args = parser.parse_args(argv)
+
+    frame = clean_chunk(load_loan_data(args.path))
+    pipeline = FeaturePipeline(imputer=Imputer(NAN_COLS, mode="median").fit(frame)).fit(frame)
+    output_mb = len(frame) * len(pipeline.columns_) * 4 / 2**20
+    print(f"{len(frame)} rows; float32 final_loan_data is {output_mb:.1f} MB")
+
+    expected, notebook_s, notebook_peak = measure(notebook_assembly, frame, pipeline.imputer_)
+    matrix, matrix_s, matrix_peak = measure(pipeline.transform_matrix, frame)
+    same = np.allclose(expected.to_numpy(dtype="float32"), matrix)
+
+    print(f"identical values: {same}")
+    print(f"{'assembly':<16} {'seconds':>8} {'peak MB':>8} {'x output':>9}")
+    for name, seconds, peak in [("notebook concat", notebook_s, notebook_peak),
+                                ("transform_matrix", matrix_s, matrix_peak)]:
+        print(f"{name:<16} {seconds:>8.3f} {peak / 2**20:>8.1f} {peak / 2**20 / output_mb:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Overhead of inline drift monitoring on the scoring path.
+
+Usage::
+
+    python -m benchmarks.bench_drift artifacts/ loan_data_2007_2014.csv --batches 256 4096 100000
+
+For each batch size, times ``DriftMonitor.update`` on a batch of the
+extract's ``final_loan_data`` rows against the preprocessing and the model
+of ``RiskScorer.score_frame`` on the same batch, and reports the monitor's
+share of the scoring time. The artifacts need a drift reference
+(``drift.npz``, written by ``credit_risk.serving train``).
+"""
+import argparse
+import time
+
+from credit_risk.loader import load_loan_data
+from credit_risk.scoring import FEATURE_SCHEMA, RiskScorer
+from credit_risk.transforms import clean_features
+
+
+def best_of(repeat, func, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--batches", type=int, nargs="+", default=[256, 4_096, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    scorer = RiskScorer.load(args.directory)
+    if scorer.monitor is None:
+        parser.error(f"{args.directory} holds no drift reference (drift.npz)")
+    frame = load_loan_data(args.path, schema=FEATURE_SCHEMA, nrows=max(args.batches))
+
+    print(f"{'batch':>7} {'preprocess ms':>13} {'model ms':>9} {'drift ms':>9} {'share':>6}")
+    for n_rows in args.batches:
+        batch = frame.iloc[:n_rows]
+        X = scorer.pipeline.transform_matrix(clean_features(batch.copy()))
+        preprocess_s = best_of(args.repeat, lambda: scorer.pipeline.transform_matrix(
+            clean_features(batch.copy())))
+        model_s = best_of(args.repeat, scorer.model.predict_proba, X)
+        drift_s = best_of(args.repeat, scorer.monitor.update, X)
+        share = drift_s / (preprocess_s + model_s + drift_s)
+        print(f"{len(batch):>7} {preprocess_s * 1e3:>13.1f} {model_s * 1e3:>9.1f} "
+              f"{drift_s * 1e3:>9.2f} {share:>6.2%}")
+
+
+if __name__ == "__main__":
+    main()
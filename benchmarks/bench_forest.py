@@ -0,0 +1,86 @@
+"""CompiledForest against the sklearn estimators: cold start and rows/sec.
+
+Usage::
+
+    python -m benchmarks.bench_forest loan_data_2007_2014.csv
+
+Fits the notebook's ``DecisionTreeClassifier(random_state=10)`` and
+``RandomForestClassifier(random_state=10)`` on its split of
+``final_loan_data``, then compares loading a pickled estimator with
+memory-mapping the exported arrays, and scoring throughput per batch size
+of the estimator, the compiled walk alone and the compiled forest handing
+batches above ``COMPILED_MAX_BATCH`` to the estimator. Every comparison
+first checks that they give identical probabilities.
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+from credit_risk.cache import load_features
+from credit_risk.forest import COMPILED_MAX_BATCH, CompiledForest, export_forest
+from credit_risk.pipeline import risk_target
+
+
+def rows_per_second(predict, X, batch_size, min_rows=2000):
+    rows = X[:max(min_rows, batch_size)]
+    start = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        predict(rows[offset:offset + batch_size])
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 64, 256, 1024, 16384])
+    args = parser.parse_args(argv)
+
+    final_loan_data, loan_risk_est = load_features(args.path)
+    train_X, val_X, train_y, _ = train_test_split(
+        final_loan_data.to_numpy(), risk_target(loan_risk_est), random_state=0
+    )
+
+    models = {"dtree": DecisionTreeClassifier(random_state=10),
+              "rfc": RandomForestClassifier(random_state=10)}
+    directory = tempfile.mkdtemp()
+    for name, model in models.items():
+        model.fit(train_X, train_y)
+        pickle_path = os.path.join(directory, f"{name}.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(model, f)
+        export_forest(model, os.path.join(directory, name))
+
+        start = time.perf_counter()
+        with open(pickle_path, "rb") as f:
+            model = pickle.load(f)
+        unpickle_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        forest = CompiledForest.load(os.path.join(directory, name))
+        load_s = time.perf_counter() - start
+
+        hybrid = CompiledForest.load(os.path.join(directory, name), estimator=model)
+
+        expected = model.predict_proba(val_X)
+        identical = (np.array_equal(forest.predict_proba(val_X), expected)
+                     and np.array_equal(hybrid.predict_proba(val_X), expected))
+        print(f"\n{name}: identical probabilities: {identical}")
+        print(f"cold start: unpickle {unpickle_s * 1000:.1f} ms, "
+              f"memory-map {load_s * 1000:.1f} ms")
+        print(f"{'batch':>7} {'sklearn rows/s':>15} {'compiled rows/s':>16} "
+              f"{f'compiled <= {COMPILED_MAX_BATCH} rows/s':>24}")
+        for batch_size in args.batch_sizes:
+            print(f"{batch_size:>7} {rows_per_second(model.predict, val_X, batch_size):>15.0f} "
+                  f"{rows_per_second(forest.predict, val_X, batch_size):>16.0f} "
+                  f"{rows_per_second(hybrid.predict, val_X, batch_size):>24.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cold-start budget of a scoring worker, measured with ``python -X importtime``.
+
+Usage::
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --artifacts artifacts/ --budget-ms 1500
+
+Imports ``credit_risk.scoring`` (and loads ``--artifacts`` with
+``RiskScorer.load(..., engine="compiled")``, the lean engine) in fresh
+interpreters, keeps the fastest of ``--repeat`` runs, and prints the
+slowest imports. Exits with status 1 if the cold start takes longer than
+``--budget-ms`` or if any module of ``FORBIDDEN`` (the EDA and training
+stack) was imported, so it can run as a check before deploying scoring
+workers.
+"""
+import argparse
+import subprocess
+import sys
+
+# Whole cold start (imports, plus loading artifacts if given)
+BUDGET_MS = 1500
+# Top-level packages a scoring worker must not import
+FORBIDDEN = ("matplotlib", "seaborn", "sklearn", "scipy", "credit_risk.eda")
+
+WORKER = """
+import time
+start = time.perf_counter()
+from credit_risk.scoring import RiskScorer
+if {artifacts!r}:
+    RiskScorer.load({artifacts!r}, engine="compiled")
+print(f"cold start ms: {{(time.perf_counter() - start) * 1000:.1f}}")
+"""
+
+
+def cold_start(artifacts=None):
+    """Return ``(milliseconds, {module: (self_us, cumulative_us)})`` of one fresh worker."""
+    run = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                          WORKER.format(artifacts=artifacts or "")],
+                         check=True, capture_output=True, text=True)
+    modules = {}
+    for line in run.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    milliseconds = float(run.stdout.split("cold start ms:")[1])
+    return milliseconds, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--artifacts", help="also time RiskScorer.load on this directory")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    milliseconds, modules = min((cold_start(args.artifacts) for _ in range(args.repeat)),
+                                key=lambda run: run[0])
+    print(f"{'module':<40} {'self ms':>8} {'cumulative ms':>13}")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][0])[
+            :args.top]:
+        print(f"{name:<40} {self_us / 1000:>8.1f} {cumulative_us / 1000:>13.1f}")
+
+    forbidden = [root for root in FORBIDDEN
+                 if any(name == root or name.startswith(root + ".") for name in modules)]
+    print(f"\n{len(modules)} modules, cold start {milliseconds:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    failed = milliseconds > args.budget_ms
+    if forbidden:
+        print(f"forbidden imports: {', '.join(forbidden)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
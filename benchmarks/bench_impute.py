@@ -0,0 +1,84 @@
+"""Wall time and accuracy of each Imputer mode against the notebook's full fit.
+
+Usage::
+
+    python -m benchmarks.bench_impute loan_data_2007_2014.csv
+
+A share of the observed values in ``NAN_COLS`` is hidden before imputing;
+accuracy is the RMSE on those hidden cells, divided by each column's
+standard deviation and averaged over the columns (0 is perfect, about 1 is
+no better than the mean). "incremental" is timed on a refresh, i.e. with the
+imputer state left behind by a previous run.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from credit_risk.impute import Imputer
+from credit_risk.loader import load_loan_data
+from credit_risk.pipeline import IMPUTER_PARAMS, NAN_COLS
+from credit_risk.transforms import clean_chunk
+
+
+def hide_values(frame, share, seed=0):
+    """Set ``share`` of the observed ``NAN_COLS`` values to NaN, return the mask."""
+    rng = np.random.default_rng(seed)
+    values = frame[NAN_COLS].to_numpy(dtype="float64")
+    hidden = ~np.isnan(values) & (rng.random(values.shape) < share)
+    frame = frame.copy()
+    frame[NAN_COLS] = np.where(hidden, np.nan, values)
+    return frame, values, hidden
+
+
+def score(imputed, truth, hidden):
+    errors = []
+    for j in range(truth.shape[1]):
+        rows = hidden[:, j]
+        std = truth[~np.isnan(truth[:, j]), j].std()
+        if rows.any() and std > 0:
+            rmse = np.sqrt(np.mean((imputed[rows, j] - truth[rows, j]) ** 2))
+            errors.append(rmse / std)
+
+    return float(np.mean(errors))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--hide", type=float, default=0.01,
+                        help="share of observed values to hide")
+    parser.add_argument("--n-samples", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    frame, truth, hidden = hide_values(clean_chunk(load_loan_data(args.path)), args.hide)
+    state_path = os.path.join(tempfile.mkdtemp(), "imputer.pkl")
+
+    modes = {
+        "iterative (notebook)": dict(IMPUTER_PARAMS),
+        "median": {"mode": "median"},
+        "median by grade": {"mode": "median", "group_by": "grade"},
+        "subsample": {"mode": "subsample", "n_samples": args.n_samples,
+                      "stratify": "loan_risk_est"},
+        "incremental refresh": {"mode": "incremental", "n_samples": args.n_samples,
+                                "stratify": "loan_risk_est", "state_path": state_path},
+    }
+    # Leave a fitted state behind for the incremental refresh to load
+    Imputer(NAN_COLS, **modes["incremental refresh"]).fit(frame)
+
+    print(f"{len(frame)} rows, {hidden.sum()} hidden values")
+    print(f"{'mode':<22} {'time (s)':>9} {'speedup':>8} {'NRMSE':>7}")
+    baseline = None
+    for name, params in modes.items():
+        start = time.perf_counter()
+        imputed = Imputer(NAN_COLS, **params).fit_transform(frame).to_numpy()
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{name:<22} {elapsed:>9.2f} {baseline / elapsed:>7.1f}x "
+              f"{score(imputed, truth, hidden):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Binned and sampled KDEs against the exact Gaussian KDE behind sns.kdeplot.
+
+Usage::
+
+    python -m benchmarks.bench_kde loan_data_2007_2014.csv --budget 10000
+
+For each of the notebook's kdeplot columns and each risk class, evaluates
+``scipy.stats.gaussian_kde`` (what seaborn uses) on the binned KDE's grid,
+then reports the time and the largest density error of ``class_kdes``
+with and without a sample budget, next to its documented error bound.
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from credit_risk.eda.distributions import class_kdes
+from credit_risk.eda.frame import load_eda_frame
+from credit_risk.eda.report import KDE_RANGES, RISK_CLASSES, _in_range
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--budget", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    frame = load_eda_frame(args.path)
+    labels = frame["loan_risk_est"].to_numpy()
+    print(f"{'column':>17} {'class':>6} {'rows':>8} {'exact s':>8} {'mode':>8} "
+          f"{'s':>7} {'max error':>10} {'bound':>10}")
+    for column, (low, high) in KDE_RANGES.items():
+        values = frame[column].to_numpy(dtype="float64")
+        kept = _in_range(values, low, high) & np.isfinite(values)
+
+        timings, summaries = {}, {}
+        for mode, budget in [("binned", None), ("sampled", args.budget)]:
+            start = time.perf_counter()
+            summaries[mode] = class_kdes(values[kept], labels[kept], RISK_CLASSES, budget=budget)
+            timings[mode] = time.perf_counter() - start
+
+        for label in RISK_CLASSES:
+            members = values[kept & (labels == label)]
+            share = len(members) / kept.sum()
+            binned = summaries["binned"][label]
+            start = time.perf_counter()
+            exact = gaussian_kde(members)(binned["grid"]) * share
+            exact_s = time.perf_counter() - start
+
+            for mode, summary in summaries.items():
+                kde = summary[label]
+                density = np.interp(binned["grid"], kde["grid"], kde["density"], left=0, right=0)
+                print(f"{column:>17} {label:>6} {len(members):>8} {exact_s:>8.2f} {mode:>8} "
+                      f"{timings[mode]:>7.3f} {np.abs(density - exact).max():>10.2e} "
+                      f"{kde['error_bound']:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
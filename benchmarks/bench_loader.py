@@ -0,0 +1,73 @@
+"""Peak RSS and wall time of the typed loader against the notebook's load.
+
+Usage::
+
+    python -m benchmarks.bench_loader loan_data_2007_2014.csv
+
+Each variant runs in a fresh interpreter so that the peak RSS of one load
+does not hide the other. The "import" variant only imports pandas and gives
+the baseline that both loads start from.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+VARIANTS = {
+    "import": "import pandas as pd",
+    "full": "import pandas as pd\n"
+            "frame = pd.read_csv({path!r}, low_memory=False)",
+    "typed": "from credit_risk.loader import load_loan_data\n"
+             "frame = load_loan_data({path!r})",
+}
+
+CHILD = """
+import json, resource, time
+start = time.perf_counter()
+{body}
+wall = time.perf_counter() - start
+shape = list(frame.shape) if "frame" in dir() else None
+nbytes = int(frame.memory_usage(deep=True).sum()) if "frame" in dir() else 0
+print(json.dumps({{"wall_s": wall,
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "frame_mb": nbytes / 2**20,
+                  "shape": shape}}))
+"""
+
+
+def run_variant(name, path):
+    code = CHILD.format(body=VARIANTS[name].format(path=path))
+    out = subprocess.run([sys.executable, "-c", code],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per variant, the fastest one is reported")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in VARIANTS:
+        runs = [run_variant(name, args.path) for _ in range(args.repeat)]
+        results[name] = min(runs, key=lambda run: run["wall_s"])
+
+    print(f"{'variant':<8} {'wall (s)':>9} {'peak RSS (MB)':>14} {'frame (MB)':>11}  shape")
+    for name, result in results.items():
+        print(f"{name:<8} {result['wall_s']:>9.2f} {result['peak_rss_mb']:>14.1f} "
+              f"{result['frame_mb']:>11.1f}  {result['shape']}")
+
+    full, typed = results["full"], results["typed"]
+    print(f"\nwall time: {full['wall_s'] / typed['wall_s']:.1f}x faster, "
+          f"peak RSS: {full['peak_rss_mb'] - typed['peak_rss_mb']:.0f} MB lower")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
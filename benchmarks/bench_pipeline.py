@@ -0,0 +1,148 @@
+"""Time and peak memory of every pipeline stage on synthetic extracts.
+
+Usage::
+
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000 --json run.json
+    python -m benchmarks.bench_pipeline --rows 10000 100000 --compare run.json
+
+For each size a synthetic extract is written with ``credit_risk.synthetic``
+(or ``--path`` is used as is) and the stages run in a fresh interpreter, so
+the peak RSS of one size does not carry over to the next: load, filter,
+clean (with each row-wise step as a nested stage), fitting the encoder and
+the imputer, feature assembly (encode / impute), split, then fit
+and predict of each model, all recorded with
+``credit_risk.profiling.Profiler``. ``--json`` writes the results, and
+``--compare`` prints the time ratio of every stage against an earlier
+results file.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from credit_risk.profiling import Profiler
+from credit_risk.synthetic import write_loan_csv
+
+# Stages slower than this ratio are marked by --compare
+REGRESSION_RATIO = 1.2
+
+
+def run_stages(path, model_names):
+    """Run the pipeline on ``path`` stage by stage and return the stage records."""
+    from sklearn.model_selection import train_test_split
+
+    from credit_risk.encoding import CategoricalEncoder
+    from credit_risk.impute import Imputer
+    from credit_risk.loader import load_loan_data
+    from credit_risk.models import default_models
+    from credit_risk.pipeline import (DUMMY_FIELDS, IMPUTER_PARAMS, NAN_COLS, ORDINAL_FIELDS,
+                                      FeaturePipeline, risk_target)
+    from credit_risk.transforms import clean_features, select_resolved
+
+    timer = Profiler()
+    frame = timer.run("load", load_loan_data, path)
+    frame = timer.run("filter", select_resolved, frame)
+    frame = timer.run("clean", clean_features, frame, timer)
+    encoder = timer.run("fit_encoder", CategoricalEncoder(ORDINAL_FIELDS, DUMMY_FIELDS).fit, frame)
+    imputer = timer.run("fit_imputer", Imputer(NAN_COLS, **IMPUTER_PARAMS).fit, frame)
+    features = timer.run("assemble", FeaturePipeline(encoder, imputer).fit_transform, frame, timer)
+    train_X, val_X, train_y, val_y = timer.run(
+        "split", train_test_split,
+        features.to_numpy(dtype="float32"), risk_target(frame["loan_risk_est"])
+    )
+
+    models = default_models()
+    for name in model_names:
+        model = timer.run(f"{name}_fit", models[name].fit, train_X, train_y)
+        timer.run(f"{name}_predict", model.predict, val_X)
+
+    return timer.records
+
+
+def run_child(path, model_names):
+    """Run ``run_stages`` in a fresh interpreter and return its records."""
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_pipeline", "--child", path,
+                          "--models", *model_names],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def compare(old, new):
+    """Print the time ratio new / old of every stage both runs measured."""
+    before = {(run["rows"], stage["stage"]): stage["seconds"]
+              for run in old["runs"] for stage in run["stages"]}
+    print(f"\n{'rows':>9} {'stage':<14} {'old (s)':>9} {'new (s)':>9} {'ratio':>6}")
+    for run in new["runs"]:
+        for stage in run["stages"]:
+            key = (run["rows"], stage["stage"])
+            if key in before:
+                ratio = stage["seconds"] / before[key]
+                flag = "  slower" if ratio > REGRESSION_RATIO else ""
+                print(f"{run['rows']:>9} {stage['stage']:<14} {before[key]:>9.3f} "
+                      f"{stage['seconds']:>9.3f} {ratio:>6.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--path", help="benchmark this extract instead of synthetic ones")
+    parser.add_argument("--models", nargs="+", default=["gnb", "knn", "dtree", "rfc"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_stages(args.child, args.models)))
+        return
+
+    results = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                        "pandas": pd.__version__, "sklearn": sklearn.__version__,
+                        "cpu_count": os.cpu_count(), "seed": args.seed,
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+               "runs": []}
+    directory = tempfile.mkdtemp()
+    for n_rows in ([None] if args.path else args.rows):
+        path = args.path
+        generate_s = None
+        if path is None:
+            path = os.path.join(directory, f"loans_{n_rows}.csv")
+            start = time.perf_counter()
+            write_loan_csv(path, n_rows, seed=args.seed)
+            generate_s = time.perf_counter() - start
+
+        stages = run_child(path, args.models)
+        results["runs"].append({"rows": n_rows, "path": path, "generate_s": generate_s,
+                                "stages": stages})
+        if path != args.path:
+            os.remove(path)
+
+        print(f"\n{n_rows or path} rows" + (f", generated in {generate_s:.1f} s" if generate_s else ""))
+        print(f"{'stage':<26} {'seconds':>8} {'shape':>13} {'RSS +MB':>8} {'peak MB':>8} "
+              f"{'copied':>6}")
+        for stage in stages:
+            name = "  " * stage["depth"] + stage["stage"]
+            shape = "x".join(map(str, stage["output_shape"] or []))
+            print(f"{name:<26} {stage['seconds']:>8.3f} {shape:>13} "
+                  f"{stage.get('rss_delta_mb', float('nan')):>8.1f} "
+                  f"{stage.get('peak_rss_mb', float('nan')):>8.0f} {stage['copied_columns']:>6}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
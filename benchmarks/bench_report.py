@@ -0,0 +1,86 @@
+"""Headless EDA report against drawing the notebook's figures one by one.
+
+Usage::
+
+    python -m benchmarks.bench_report loan_data_2007_2014.csv --max-workers 1 4
+
+The notebook path draws the same figures as ``credit_risk.eda.report``
+from the raw rows (``sns.kdeplot``, ``plt.hist``, ``field_risk_vis``,
+``sns.heatmap``) and saves each one, serially and with the Agg backend so
+both sides pay for PNG encoding only.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from credit_risk.eda.frame import CATEGORICAL_FIELDS, DATE_FIELDS, load_eda_frame, low_cardinality_fields  # noqa: E402
+from credit_risk.eda.report import KDE_RANGES, _in_range, render_report  # noqa: E402
+from credit_risk.pipeline import NUM_COLS  # noqa: E402
+
+
+def notebook_report(nnc_loan_data, directory):
+    def save(name):
+        plt.savefig(os.path.join(directory, f"{name}.png"))
+        plt.close("all")
+
+    def field_risk_vis(field):
+        ratio = (nnc_loan_data.groupby(field, observed=True)["loan_risk_est"]
+                 .value_counts(normalize=True)
+                 .mul(100)
+                 .rename("Risky Percentage")
+                 .reset_index())
+        sns.lineplot(ratio[ratio["loan_risk_est"] == "risky"],
+                     x=field, y="Risky Percentage")
+        plt.title(field)
+        save(f"risk_{field}")
+
+    for column, (low, high) in KDE_RANGES.items():
+        kept = _in_range(nnc_loan_data[column].to_numpy(), low, high)
+        sns.kdeplot(nnc_loan_data[kept], x=column, hue="loan_risk_est")
+        save(f"kde_{column}")
+
+    for field in low_cardinality_fields(nnc_loan_data) + DATE_FIELDS:
+        field_risk_vis(field)
+
+    for column in NUM_COLS:
+        plt.hist(nnc_loan_data[column])
+        plt.title(column)
+        save(f"hist_{column}")
+
+    plt.figure(figsize=(12, 6))
+    sns.heatmap(data=nnc_loan_data[NUM_COLS].corr(), annot=True)
+    save("correlation")
+
+    for field in CATEGORICAL_FIELDS:
+        plt.figure(figsize=(12, 4))
+        field_risk_vis(field)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--max-workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    args = parser.parse_args(argv)
+
+    frame = load_eda_frame(args.path)
+    print(f"{len(frame)} rows")
+
+    start = time.perf_counter()
+    notebook_report(frame, tempfile.mkdtemp())
+    print(f"notebook figures, serial: {time.perf_counter() - start:.2f} s")
+
+    for max_workers in args.max_workers:
+        start = time.perf_counter()
+        render_report(frame, tempfile.mkdtemp(), max_workers)
+        print(f"render_report, {max_workers} worker(s): {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""risk_profiles against one groupby/value_counts per field_risk_vis call.
+
+Usage::
+
+    python -m benchmarks.bench_risk loan_data_2007_2014.csv
+
+Computes the risky percentage of every field the notebook passes to
+``field_risk_vis`` (the low-cardinality fields, the date fields and the
+categorical fields), both the notebook's way and with ``risk_profiles``,
+and checks that the two agree.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from credit_risk.eda.frame import CATEGORICAL_FIELDS, DATE_FIELDS, load_eda_frame, low_cardinality_fields
+from credit_risk.eda.risk import RISKY_PERCENTAGE, risk_profiles
+
+
+def notebook_ratios(nnc_loan_data, fields):
+    """The table part of the notebook's ``field_risk_vis``, once per field."""
+    ratios = {}
+    for field in fields:
+        ratio = (nnc_loan_data.groupby(field, observed=True)["loan_risk_est"]
+                 .value_counts(normalize=True)
+                 .mul(100)
+                 .rename(RISKY_PERCENTAGE)
+                 .reset_index())
+        ratios[field] = ratio[ratio["loan_risk_est"] == "risky"]
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    args = parser.parse_args(argv)
+
+    frame = load_eda_frame(args.path)
+    fields = low_cardinality_fields(frame) + DATE_FIELDS + CATEGORICAL_FIELDS
+    print(f"{len(frame)} rows, {len(fields)} fields")
+
+    start = time.perf_counter()
+    ratios = notebook_ratios(frame, fields)
+    notebook_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    profiles = risk_profiles(frame, fields)
+    engine_s = time.perf_counter() - start
+
+    agree = all(
+        np.allclose(profiles[field].loc[ratios[field][field], RISKY_PERCENTAGE].to_numpy(),
+                    ratios[field][RISKY_PERCENTAGE].to_numpy())
+        for field in fields
+    )
+    print(f"tables agree: {agree}")
+    print(f"groupby per field: {notebook_s:.3f} s")
+    print(f"risk_profiles:     {engine_s:.3f} s ({notebook_s / engine_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""p50/p99 latency and throughput of the scoring server under local load.
+
+Usage::
+
+    python -m benchmarks.bench_serving loan_data_2007_2014.csv --max-batch 1 64 256
+
+Trains scoring artifacts from the extract, keeping the sklearn estimator
+(unless ``--artifacts`` points to existing ones), starts
+``python -m credit_risk.serving serve`` once per ``--engine`` and
+``--max-batch`` value and drives it with ``--concurrency`` keep-alive
+clients, each posting one application record per request. ``--max-batch 1``
+turns micro-batching off. The engines are those of ``RiskScorer.load``;
+"sklearn" and "auto" need artifacts trained with ``--keep-estimator``.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from credit_risk.loader import load_loan_data
+from credit_risk.scoring import ENGINES, FEATURE_SCHEMA, train_artifacts
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sample_records(path, n_records):
+    frame = load_loan_data(path, schema=FEATURE_SCHEMA, nrows=n_records)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
+
+
+async def client(port, bodies, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for body in bodies:
+        start = time.perf_counter()
+        writer.write(b"POST /score HTTP/1.1\r\nHost: localhost\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        await writer.drain()
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = int(headers.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(port, records, concurrency, requests):
+    bodies = [json.dumps({"records": [records[i % len(records)]]}).encode()
+              for i in range(requests)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, bodies[i::concurrency], latencies)
+                           for i in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def wait_until_up(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--artifacts", help="existing artifacts directory")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 64, 256])
+    parser.add_argument("--engine", nargs="+", choices=ENGINES,
+                        default=["compiled", "sklearn", "auto"])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.artifacts is None:
+        args.artifacts = tempfile.mkdtemp()
+        train_artifacts(args.path, args.artifacts, keep_estimator=True)
+    records = sample_records(args.path, 1000)
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients")
+    print(f"{'engine':>8} {'max_batch':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'req/s':>8}")
+    for engine, max_batch in itertools.product(args.engine, args.max_batch):
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "credit_risk.serving", "serve",
+                                   args.artifacts, "--port", str(port),
+                                   "--max-batch", str(max_batch), "--engine", engine],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            wait_until_up(port)
+            # Warm up the server before measuring
+            asyncio.run(load(port, records, args.concurrency, args.concurrency))
+            latencies, elapsed = asyncio.run(
+                load(port, records, args.concurrency, args.requests)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{engine:>8} {max_batch:>9} {p50:>9.2f} {p99:>9.2f} "
+              f"{args.requests / elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Memory and fit time of the dense and CSR feature matrices per model.
+
+Usage::
+
+    python -m benchmarks.bench_sparse loan_data_2007_2014.csv
+
+Builds ``final_loan_data`` twice, with ``FeaturePipeline.transform_matrix``
+and ``transform_sparse``, for the notebook's encoding and for one with
+"addr_state" one-hot encoded as well (the higher-cardinality case), then
+fits and scores each model on both: sparse-capable models on the CSR
+matrix whatever its density, the others on a dense copy. That is the
+measurement behind ``credit_risk.models.SPARSE_MAX_DENSITY``. A median
+imputer keeps the preprocessing out of the way.
+"""
+import argparse
+import time
+
+from sklearn.model_selection import train_test_split
+
+from credit_risk.encoding import CategoricalEncoder
+from credit_risk.impute import Imputer
+from credit_risk.loader import load_loan_data
+from credit_risk.models import accepts_sparse, default_models, density
+from credit_risk.pipeline import DUMMY_FIELDS, NAN_COLS, ORDINAL_FIELDS, FeaturePipeline, risk_target
+from credit_risk.transforms import clean_chunk
+
+ENCODINGS = {
+    "notebook": (ORDINAL_FIELDS, DUMMY_FIELDS),
+    "addr_state one-hot": (["grade"], DUMMY_FIELDS + ["addr_state"]),
+}
+
+
+def matrix_mb(X):
+    if hasattr(X, "indptr"):
+        return (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 2**20
+    return X.nbytes / 2**20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--models", nargs="+", default=["gnb", "knn", "dtree", "rfc"])
+    args = parser.parse_args(argv)
+
+    frame = clean_chunk(load_loan_data(args.path))
+    y = risk_target(frame["loan_risk_est"])
+    imputer = Imputer(NAN_COLS, mode="median").fit(frame)
+
+    print(f"{'encoding':<19} {'model':<6} {'input':<7} {'matrix MB':>9} {'density':>7} {'build s':>8} "
+          f"{'fit s':>7} {'predict s':>9} {'accuracy':>8}")
+    for encoding, (ordinal, onehot) in ENCODINGS.items():
+        encoder = CategoricalEncoder(ordinal, onehot).fit(frame)
+        pipeline = FeaturePipeline(encoder, imputer).fit(frame)
+        for build in (pipeline.transform_matrix, pipeline.transform_sparse):
+            start = time.perf_counter()
+            X = build(frame)
+            build_s = time.perf_counter() - start
+            stored = density(X) if hasattr(X, "indptr") else 1.0
+            train_X, val_X, train_y, val_y = train_test_split(X, y, random_state=0)
+
+            models = default_models()
+            for name in args.models:
+                model = models[name]
+                fit_X, score_X = train_X, val_X
+                if hasattr(X, "indptr") and not accepts_sparse(model):
+                    fit_X, score_X = train_X.toarray(), val_X.toarray()
+                start = time.perf_counter()
+                model.fit(fit_X, train_y)
+                fit_s = time.perf_counter() - start
+                start = time.perf_counter()
+                accuracy = (model.predict(score_X) == val_y).mean()
+                predict_s = time.perf_counter() - start
+                kind = "sparse" if hasattr(fit_X, "indptr") else "dense"
+                print(f"{encoding:<19} {name:<6} {kind:<7} {matrix_mb(X):>9.1f} {stored:>7.2f} {build_s:>8.3f} "
+                      f"{fit_s:>7.2f} {predict_s:>9.2f} {accuracy:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Data profile of loan extracts: pandas summaries vs. one-pass accumulators.
+
+Usage::
+
+    python -m benchmarks.bench_stats loan_data_2007_2014.csv --chunksize 100000
+
+The paths are shards of one history. The notebook's way loads them all,
+then runs ``corr()``, ``pd.pivot_table`` by "loan_risk_est" with the mean
+and ``np.max`` and ``describe()`` over the numeric columns, one scan each.
+``credit_risk.eda.stats`` gets all of them from one ``StatsAccumulator``
+per shard, read chunk by chunk and merged: once in this process (for the
+tracemalloc peak) and once with ``profile_files`` (a process per shard).
+Reports the largest differences between the two sets of summaries; the
+quartiles differ only once a column exceeds the reservoir size.
+"""
+import argparse
+import time
+import tracemalloc
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.eda.frame import load_eda_frame
+from credit_risk.eda.stats import StatsAccumulator, profile_csv, profile_files
+from credit_risk.pipeline import NUM_COLS
+
+
+def pandas_profile(paths):
+    frame = pd.concat([load_eda_frame(path) for path in paths], ignore_index=True)
+    return {"corr": frame[NUM_COLS].corr(),
+            "mean": pd.pivot_table(frame, index="loan_risk_est", values=NUM_COLS,
+                                   observed=True),
+            "max": pd.pivot_table(frame, index="loan_risk_est", values=NUM_COLS,
+                                  aggfunc="max", observed=True),
+            "describe": frame[NUM_COLS].describe()}
+
+
+def accumulator_profile(paths, chunksize):
+    accumulator = reduce(StatsAccumulator.merge,
+                         (profile_csv(path, chunksize=chunksize, random_state=seed)
+                          for seed, path in enumerate(paths)))
+    return summaries(accumulator)
+
+
+def summaries(accumulator):
+    return {"corr": accumulator.corr(), "mean": accumulator.pivot("mean"),
+            "max": accumulator.pivot("max"), "describe": accumulator.describe()}
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--max-workers", type=int)
+    args = parser.parse_args(argv)
+
+    expected, pandas_s, pandas_peak = measure(pandas_profile, args.paths)
+    result, stream_s, stream_peak = measure(accumulator_profile, args.paths, args.chunksize)
+    start = time.perf_counter()
+    summaries(profile_files(args.paths, chunksize=args.chunksize, max_workers=args.max_workers))
+    pool_s = time.perf_counter() - start
+
+    print(f"{'':<24} {'seconds':>8} {'peak MB':>8}")
+    print(f"{'pandas (load + 4 scans)':<24} {pandas_s:>8.2f} {pandas_peak / 2**20:>8.1f}")
+    print(f"{'accumulator, 1 process':<24} {stream_s:>8.2f} {stream_peak / 2**20:>8.1f}")
+    print(f"{'profile_files':<24} {pool_s:>8.2f} {'':>8}")
+
+    print("\nlargest difference")
+    print(f"corr (absolute): {np.nanmax(np.abs(result['corr'] - expected['corr']).to_numpy()):.2e}")
+    for name in ("mean", "max"):
+        relative = (result[name] - expected[name]) / expected[name].abs()
+        print(f"pivot {name} (relative): {np.nanmax(np.abs(relative).to_numpy()):.2e}")
+    relative = np.abs((result["describe"] - expected["describe"]) / expected["describe"].abs())
+    for row in ("count", "mean", "std", "min", "max", "25%", "50%", "75%"):
+        print(f"describe {row} (relative): {np.nanmax(relative.loc[row].to_numpy()):.2e}")
+
+
+if __name__ == "__main__":
+    main()
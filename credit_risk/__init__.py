@@ -0,0 +1,6 @@
+"""Credit risk preprocessing and modelling pipeline.
+
+Production counterpart of ``Analysis.py``: the notebook documents how the
+LendingClub 2007-2014 extract is explored and cleaned, this package runs the
+same steps on data that does not fit the notebook's assumptions.
+"""
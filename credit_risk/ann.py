@@ -0,0 +1,187 @@
+"""Approximate nearest-neighbour KNN classifier for large scoring batches.
+
+``KNeighborsClassifier()`` in the notebook searches every training row for
+every query on unscaled features. ``IVFKNeighborsClassifier`` standardizes
+the features and builds an inverted-file index: the training rows are
+clustered with k-means into ``n_lists`` lists, and a query only searches the
+``n_probe`` lists whose centroids are closest to it. With ``n_lists`` around
+the square root of the training size, each query scans about
+``n_probe * sqrt(n)`` rows instead of ``n``.
+
+Queries are processed in batches, list by list: every query probing a list
+is compared with the list's rows in one matrix product, and the running
+top-k of each query is merged in place. ``benchmarks/bench_ann.py`` reports
+the neighbour recall and accuracy loss against exact KNN.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+
+def _squared_distances(queries, points, points_sq=None):
+    """Return the (n_queries, n_points) matrix of squared Euclidean distances."""
+    if points_sq is None:
+        points_sq = np.einsum("ij,ij->i", points, points)
+    queries_sq = np.einsum("ij,ij->i", queries, queries)
+    distances = queries_sq[:, None] - 2 * queries @ points.T + points_sq[None, :]
+    return np.maximum(distances, 0, out=distances)
+
+
+def _nearest(queries, points, k, batch_size):
+    """Return the indices of the ``k`` nearest ``points`` of each query."""
+    points_sq = np.einsum("ij,ij->i", points, points)
+    nearest = np.empty((len(queries), k), dtype=np.intp)
+    for start in range(0, len(queries), batch_size):
+        distances = _squared_distances(queries[start:start + batch_size], points, points_sq)
+        if k < len(points):
+            part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(len(points)), (len(distances), len(points)))
+        order = np.take_along_axis(distances, part, axis=1).argsort(axis=1)
+        nearest[start:start + batch_size] = np.take_along_axis(part, order, axis=1)
+
+    return nearest
+
+
+def fit_standardizer(X):
+    """Return the ``(mean, scale)`` that standardize the columns of ``X``."""
+    X = np.asarray(X, dtype="float32")
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1
+    return X.mean(axis=0), scale
+
+
+def standardize(X, mean, scale):
+    return ((np.asarray(X, dtype="float32") - mean) / scale).astype("float32")
+
+
+def kmeans(X, n_clusters, n_iter=10, sample_size=None, batch_size=8192, random_state=0):
+    """Return ``n_clusters`` k-means centroids of ``X`` (Lloyd's algorithm).
+
+    The centroids are trained on ``sample_size`` random rows (by default 64
+    per cluster), which is plenty for routing queries to lists.
+    """
+    rng = np.random.default_rng(random_state)
+    if sample_size is None:
+        sample_size = 64 * n_clusters
+    if sample_size < len(X):
+        X = X[rng.choice(len(X), sample_size, replace=False)]
+
+    centroids = X[rng.choice(len(X), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _nearest(X, centroids, 1, batch_size)[:, 0]
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        filled = counts > 0
+        # Empty clusters keep their previous centroid
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+    return centroids
+
+
+class IVFKNeighborsClassifier(ClassifierMixin, BaseEstimator):
+    """KNN classifier searching an inverted-file index of standardized features.
+
+    ``n_lists`` defaults to ``sqrt(n_samples)``; raising ``n_probe`` trades
+    speed for recall (``n_probe == n_lists`` is an exact search).
+    """
+
+    def __init__(self, n_neighbors=5, n_lists=None, n_probe=8, batch_size=4096,
+                 random_state=0):
+        self.n_neighbors = n_neighbors
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def _scale(self, X):
+        return standardize(X, self.mean_, self.scale_)
+
+    def fit(self, X, y):
+        self.classes_, y = np.unique(y, return_inverse=True)
+        self.mean_, self.scale_ = fit_standardizer(X)
+        X = self._scale(X)
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(X))))
+        self.centroids_ = kmeans(X, n_lists, random_state=self.random_state)
+
+        # Store the rows grouped by list, so each list is one contiguous slice
+        labels = _nearest(X, self.centroids_, 1, self.batch_size)[:, 0]
+        self.order_ = np.argsort(labels, kind="stable")
+        self.offsets_ = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        self.points_ = X[self.order_]
+        self.points_sq_ = np.einsum("ij,ij->i", self.points_, self.points_)
+        self.y_ = y[self.order_]
+        return self
+
+    def _search(self, queries):
+        """Return ``(squared_distances, positions)`` of the neighbours of a batch."""
+        k = self.n_neighbors
+        n_probe = min(self.n_probe, len(self.centroids_))
+        best_d = np.full((len(queries), k), np.inf, dtype="float32")
+        best_i = np.full((len(queries), k), -1, dtype=np.intp)
+
+        probes = _nearest(queries, self.centroids_, n_probe, self.batch_size)
+        # Visit each list once, with every query that probes it
+        query_of = np.repeat(np.arange(len(queries)), n_probe)
+        list_of = probes.ravel()
+        by_list = np.argsort(list_of, kind="stable")
+        bounds = np.searchsorted(list_of[by_list], np.arange(len(self.centroids_) + 1))
+
+        for lst in np.flatnonzero(np.diff(bounds)):
+            start, stop = self.offsets_[lst], self.offsets_[lst + 1]
+            if start == stop:
+                continue
+            rows = query_of[by_list[bounds[lst]:bounds[lst + 1]]]
+            distances = _squared_distances(queries[rows], self.points_[start:stop],
+                                           self.points_sq_[start:stop])
+            positions = np.broadcast_to(np.arange(start, stop), distances.shape)
+            if stop - start > k:
+                part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                distances = np.take_along_axis(distances, part, axis=1)
+                positions = np.take_along_axis(positions, part, axis=1)
+
+            merged_d = np.concatenate([best_d[rows], distances], axis=1)
+            merged_i = np.concatenate([best_i[rows], positions], axis=1)
+            keep = np.argsort(merged_d, axis=1, kind="stable")[:, :k]
+            best_d[rows] = np.take_along_axis(merged_d, keep, axis=1)
+            best_i[rows] = np.take_along_axis(merged_i, keep, axis=1)
+
+        return best_d, best_i
+
+    def kneighbors(self, X):
+        """Return ``(distances, indices)`` of the neighbours, like sklearn.
+
+        Indices refer to rows of the training data; rows with fewer than
+        ``n_neighbors`` candidates in their probed lists are padded with -1.
+        """
+        X = self._scale(X)
+        distances = np.empty((len(X), self.n_neighbors), dtype="float32")
+        indices = np.empty((len(X), self.n_neighbors), dtype=np.intp)
+        for start in range(0, len(X), self.batch_size):
+            stop = start + self.batch_size
+            batch_d, batch_i = self._search(X[start:stop])
+            distances[start:stop] = np.sqrt(batch_d)
+            indices[start:stop] = np.where(batch_i >= 0, self.order_[batch_i], -1)
+
+        return distances, indices
+
+    def predict_proba(self, X):
+        X = self._scale(X)
+        proba = np.zeros((len(X), len(self.classes_)))
+        for start in range(0, len(X), self.batch_size):
+            _, positions = self._search(X[start:start + self.batch_size])
+            found = positions >= 0
+            votes = np.where(found, self.y_[positions], len(self.classes_))
+            # One bincount over (row, class) pairs; missing neighbours vote
+            # for an extra class that is dropped again
+            n_classes = len(self.classes_) + 1
+            flat = (np.arange(len(votes))[:, None] * n_classes + votes).ravel()
+            counts = np.bincount(flat, minlength=len(votes) * n_classes)
+            counts = counts.reshape(len(votes), n_classes)[:, :-1]
+            proba[start:start + len(votes)] = counts / np.maximum(found.sum(axis=1), 1)[:, None]
+
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
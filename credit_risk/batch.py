@@ -0,0 +1,234 @@
+"""Parallel batch scoring of large application files, with resumable checkpoints.
+
+Backfills and portfolio re-scoring run the saved model over every loan of
+an extract, including the "Current" / "In Grace Period" rows that training
+filters out. ``score_file`` streams the input (CSV or Parquet)
+``chunksize`` rows at a time and fans the chunks out to a process pool.
+Each worker loads the artifacts once (``RiskScorer``: the fitted
+preprocessing and the model, the kept sklearn forest if there is one since
+chunks are far above the batch sizes the compiled forest is fast at),
+scores its chunk and writes it as one Parquet part of the output
+directory::
+
+    out/part-000000.parquet   rows 0 .. chunksize - 1
+    out/part-000001.parquet   rows chunksize .. 2 * chunksize - 1
+    ...
+
+Parts are named by chunk number, so reading the directory
+(``pd.read_parquet(out)``) returns the predictions in input order. Each
+holds the input row number, the ``KEY_COLUMNS`` found in the input and
+"probability", the predicted P(risky). If the artifacts hold a drift
+reference, the workers' drift counts are summed and the most drifted
+columns are reported at the end.
+
+Every part is written to a temporary file and renamed, so a part that
+exists is complete: it is the checkpoint of its chunk. Rerunning the same
+command after an interruption skips the chunks whose part exists (they are
+still read, but not scored). ``_checkpoint.json`` records the input (its
+absolute path, size and modification time) and the chunk size; a rerun on
+another or a modified input, or with a different chunk size, is refused
+since its chunks would not line up with the parts. Like the temporary
+files, it starts with "_", which Parquet readers skip.
+
+Usage::
+
+    python -m credit_risk.batch artifacts/ loans.csv scores/ --chunksize 200000
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.drift import DriftMonitor, DriftReference
+from credit_risk.forest import CompiledForest
+from credit_risk.loader import iter_loan_chunks
+from credit_risk.scoring import ENGINES, FEATURE_SCHEMA, RiskScorer
+
+# Input columns copied next to the predictions, if present
+KEY_COLUMNS = {"id": "int64", "loan_status": "category"}
+CHECKPOINT = "_checkpoint.json"
+CHUNKSIZE = 200_000
+
+# The scorer of this worker process, loaded by _init_worker
+_scorer = None
+
+
+def _part_path(directory, index):
+    return os.path.join(directory, f"part-{index:06d}.parquet")
+
+
+def _input_columns(path):
+    """Return the schema to read from ``path``: the features plus the keys it has."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        names = set(pq.ParquetFile(path).schema_arrow.names)
+    else:
+        names = set(pd.read_csv(path, nrows=0).columns)
+    return {**FEATURE_SCHEMA, **{column: dtype for column, dtype in KEY_COLUMNS.items()
+                                 if column in names}}
+
+
+def iter_input(path, chunksize=CHUNKSIZE, schema=None):
+    """Yield chunks of at most ``chunksize`` rows of ``schema`` from a CSV or Parquet file."""
+    if schema is None:
+        schema = _input_columns(path)
+    if not path.endswith(".parquet"):
+        yield from iter_loan_chunks(path, chunksize, schema)
+        return
+
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(chunksize, columns=list(schema)):
+        yield batch.to_pandas().astype(schema)
+
+
+def _single_threaded(model):
+    """Set ``n_jobs=1`` on the sklearn estimators ``model`` scores with, if any."""
+    for part in getattr(model, "models_", [model]):
+        # A CompiledForest hands large batches to the estimator it holds
+        estimator = part.estimator if isinstance(part, CompiledForest) else part
+        if estimator is not None and hasattr(estimator, "get_params") and "n_jobs" in estimator.get_params():
+            estimator.set_params(n_jobs=1)
+
+
+def _init_worker(directory, engine):
+    global _scorer
+    _scorer = RiskScorer.load(directory, engine)
+    # The pool already runs a process per core; the trained forest has n_jobs=-1
+    _single_threaded(_scorer.model)
+
+
+def _score_chunk(out_dir, index, start_row, frame):
+    start = time.perf_counter()
+    scores = pd.DataFrame({"row": np.arange(start_row, start_row + len(frame))})
+    for column in KEY_COLUMNS:
+        if column in frame:
+            scores[column] = frame[column].array
+    scores["probability"] = _scorer.score_frame(frame[list(FEATURE_SCHEMA)])
+    drift = None
+    if _scorer.monitor is not None:
+        drift = _scorer.monitor.counts.copy()
+        _scorer.monitor.reset()
+
+    path = _part_path(out_dir, index)
+    partial = os.path.join(out_dir, f"_{os.path.basename(path)}.tmp")
+    scores.to_parquet(partial, index=False)
+    os.replace(partial, path)
+    return len(frame), time.perf_counter() - start, drift
+
+
+def _open_checkpoint(out_dir, path, chunksize):
+    """Create or check ``out_dir`` and return the chunk numbers already scored."""
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT)
+    # Stamped like the sources of credit_risk.cache: a rewritten file is another input
+    stat = os.stat(path)
+    state = {"input": os.path.abspath(path), "stamp": [stat.st_size, stat.st_mtime_ns],
+             "chunksize": chunksize}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            previous = json.load(f)
+        if previous["input"] != state["input"]:
+            raise ValueError(f"{out_dir} holds scores of {previous['input']}, not "
+                             f"{state['input']}; use a new directory")
+        if previous.get("stamp") != state["stamp"]:
+            raise ValueError(f"{state['input']} changed (size or mtime) since {out_dir} was "
+                             f"scored; use a new directory")
+        if previous["chunksize"] != chunksize:
+            raise ValueError(f"{out_dir} was scored with chunksize={previous['chunksize']}, "
+                             f"got {chunksize}; use the same chunk size or a new directory")
+    else:
+        with open(checkpoint_path, "w") as f:
+            json.dump(state, f)
+
+    return {int(name[len("part-"):-len(".parquet")]) for name in os.listdir(out_dir)
+            if name.startswith("part-") and name.endswith(".parquet")}
+
+
+def score_file(directory, path, out_dir, chunksize=CHUNKSIZE, max_workers=None, log=None,
+               engine="auto"):
+    """Score every row of ``path`` with the artifacts in ``directory`` into ``out_dir``.
+
+    Workers load the artifacts with ``RiskScorer.load(directory, engine)``:
+    by default chunks are scored by the sklearn forest if the artifacts
+    kept it (``--keep-estimator``), since the compiled forest is only
+    faster on small batches. The estimator runs on one thread per worker,
+    as the pool already has a worker per core. At most two chunks per
+    worker are in flight, so memory stays bounded by the chunk size.
+    ``log``, if given, is called with a progress line after every chunk.
+    Returns a dict with the rows scored in this run, the rows skipped from
+    earlier runs, the seconds, rows per second and, if the artifacts hold
+    a drift reference, the ``DriftMonitor.scores`` of the rows scored in
+    this run ("drift").
+    """
+    done = _open_checkpoint(out_dir, path, chunksize)
+    monitor = None
+    if os.path.exists(os.path.join(directory, "drift.npz")):
+        monitor = DriftMonitor(DriftReference.load(os.path.join(directory, "drift.npz")))
+    max_workers = max_workers or os.cpu_count()
+    scored = skipped = 0
+    pending = deque()
+    start = time.perf_counter()
+
+    def collect():
+        nonlocal scored
+        index, future = pending.popleft()
+        n_rows, _, drift = future.result()
+        scored += n_rows
+        if drift is not None:
+            monitor.counts += drift
+        if log is not None:
+            elapsed = time.perf_counter() - start
+            log(f"chunk {index}: {scored + skipped} rows, {scored / elapsed:,.0f} rows/s")
+
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                             initargs=(directory, engine)) as executor:
+        start_row = 0
+        for index, chunk in enumerate(iter_input(path, chunksize)):
+            if index in done:
+                skipped += len(chunk)
+            else:
+                pending.append((index, executor.submit(_score_chunk, out_dir, index,
+                                                       start_row, chunk)))
+                if len(pending) >= 2 * max_workers:
+                    collect()
+            start_row += len(chunk)
+        while pending:
+            collect()
+
+    seconds = time.perf_counter() - start
+    return {"rows": scored, "skipped": skipped, "seconds": seconds,
+            "rows_per_s": scored / seconds if seconds else np.nan,
+            "drift": None if monitor is None else monitor.scores()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a large application file in parallel.")
+    parser.add_argument("directory", help="artifacts written by credit_risk.serving train")
+    parser.add_argument("path", help="input CSV or Parquet file")
+    parser.add_argument("out_dir", help="directory of ordered Parquet parts (and checkpoints)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--max-workers", type=int)
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="how tree models score (see RiskScorer.load)")
+    parser.add_argument("--quiet", action="store_true", help="no per-chunk progress")
+    args = parser.parse_args(argv)
+
+    result = score_file(args.directory, args.path, args.out_dir, args.chunksize,
+                        args.max_workers, log=None if args.quiet else print,
+                        engine=args.engine)
+    print(f"Scored {result['rows']:,} rows in {result['seconds']:.1f} s "
+          f"({result['rows_per_s']:,.0f} rows/s); {result['skipped']:,} rows already scored")
+    if result["drift"] is not None and result["rows"]:
+        print("\nMost drifted columns")
+        print(result["drift"].head(10).to_string(float_format="{:.4f}".format))
+
+
+if __name__ == "__main__":
+    main()
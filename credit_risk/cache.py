@@ -0,0 +1,156 @@
+"""On-disk cache of ``final_loan_data`` keyed by input file and pipeline settings.
+
+Each entry is a directory holding the feature matrix as a float32 ``.npy``
+file, the "loan_risk_est" codes and the column names. A cached matrix is
+memory-mapped rather than read, so a warm start costs a few file opens no
+matter how large the extract is.
+
+The key is a hash of the source file's content and of ``pipeline_config()``;
+changing either one starts a new entry. Content hashes are remembered per
+``(path, size, mtime)``, so an unchanged file is only hashed once.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.pipeline import build_from_csv, pipeline_config
+
+DEFAULT_DIR = ".feature_cache"
+DEFAULT_MAX_BYTES = 8 * 2**30
+
+RISK_LABELS = ["good", "risky"]
+
+
+def file_digest(path, block_size=2**20):
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Directory of cached feature matrices, evicted oldest-first past ``max_bytes``."""
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def _source_digest(self, path):
+        index_path = os.path.join(self.directory, "sources.json")
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+
+        stat = os.stat(path)
+        source = os.path.abspath(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        if index.get(source, {}).get("stamp") != stamp:
+            index[source] = {"stamp": stamp, "digest": file_digest(path)}
+            with open(index_path, "w") as f:
+                json.dump(index, f)
+
+        return index[source]["digest"]
+
+    def key(self, path, config=None):
+        """Return the entry key of the extract at ``path`` under ``config``."""
+        if config is None:
+            config = pipeline_config()
+
+        digest = hashlib.sha256(self._source_digest(path).encode())
+        digest.update(json.dumps(config, sort_keys=True).encode())
+        return digest.hexdigest()[:32]
+
+    def load(self, key):
+        """Return the cached ``(final_loan_data, loan_risk_est)``, or ``None``."""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, "columns.json")) as f:
+                columns = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        matrix = np.load(os.path.join(entry, "X.npy"), mmap_mode="r")
+        codes = np.load(os.path.join(entry, "y.npy"), mmap_mode="r")
+        # Mark the entry as recently used for eviction
+        os.utime(entry)
+
+        final_loan_data = pd.DataFrame(matrix, columns=columns, copy=False)
+        loan_risk_est = pd.Series(pd.Categorical.from_codes(codes, RISK_LABELS),
+                                  name="loan_risk_est")
+        return final_loan_data, loan_risk_est
+
+    def store(self, key, final_loan_data, loan_risk_est):
+        """Write an entry for ``key``, then evict old entries past ``max_bytes``."""
+        entry = self._entry(key)
+        partial = entry + ".partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        os.makedirs(partial)
+
+        np.save(os.path.join(partial, "X.npy"),
+                final_loan_data.to_numpy(dtype="float32"))
+        np.save(os.path.join(partial, "y.npy"),
+                pd.Categorical(loan_risk_est, categories=RISK_LABELS).codes.astype("int8"))
+        # columns.json is what load() looks for, so write it last
+        with open(os.path.join(partial, "columns.json"), "w") as f:
+            json.dump([str(column) for column in final_loan_data.columns], f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(partial, entry)
+        self.evict(keep=[key])
+
+    def entries(self):
+        """Return ``(key, size_in_bytes, last_used)`` of every entry, oldest first."""
+        entries = []
+        for key in os.listdir(self.directory):
+            entry = self._entry(key)
+            if not os.path.isdir(entry) or key.endswith(".partial"):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            entries.append((key, size, os.path.getmtime(entry)))
+
+        return sorted(entries, key=lambda item: item[2])
+
+    def evict(self, keep=()):
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+
+
+def load_features(path, cache=None):
+    """Return ``(final_loan_data, loan_risk_est)`` for the extract at ``path``.
+
+    The first call builds the features and stores them in ``cache`` (a
+    ``FeatureCache`` in ``.feature_cache`` by default); later calls with the
+    same file and settings memory-map the stored matrix instead.
+    """
+    if cache is None:
+        cache = FeatureCache()
+
+    key = cache.key(path)
+    cached = cache.load(key)
+    if cached is not None:
+        return cached
+
+    final_loan_data, loan_risk_est = build_from_csv(path)
+    cache.store(key, final_loan_data, loan_risk_est)
+    return cache.load(key)
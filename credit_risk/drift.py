@@ -0,0 +1,144 @@
+"""Drift of scored applications away from the training distribution.
+
+At training time ``DriftReference.fit`` bins every column of
+``final_loan_data``: columns with at most ``MAX_BINS`` distinct values
+(codes, dummies, flags) get one bin per value, the others ``MAX_BINS``
+quantile bins; missing values have a bin of their own. Only the cut
+points and the training counts per bin are kept.
+
+``DriftMonitor`` then counts the scored rows into the same bins. A batch
+costs one ``np.searchsorted`` per column and a single ``np.bincount``
+over all of them (each column's bins are offset into one flat count
+array), and memory stays at one count per bin however many rows go
+through. (Columns with only a few cut points, such as the dummies, are
+binned with one vectorized comparison per cut point instead, which is
+cheaper than a binary search per value.) ``scores`` compares the counts
+so far with the reference:
+
+* PSI, the population stability index ``sum((a - e) * ln(a / e))`` over
+  the bin shares, with empty bins floored at ``PSI_FLOOR``; the usual
+  reading is < 0.1 stable, 0.1 - 0.25 moderate, > 0.25 major shift;
+* KS, the largest gap between the cumulative bin shares (a lower bound of
+  the exact two-sample statistic, equal to it at the cut points);
+* the share of missing values on both sides.
+
+``RiskScorer`` updates a monitor on every batch it scores when the
+artifacts hold a reference (``drift.npz``).
+"""
+import numpy as np
+import pandas as pd
+
+MAX_BINS = 20
+PSI_FLOOR = 1e-4
+# Columns with at most this many cut points are binned by comparisons
+LINEAR_CUTS = 8
+
+
+def _cut_points(values, max_bins=MAX_BINS):
+    values = values[~np.isnan(values)]
+    distinct = np.unique(values)
+    if len(distinct) <= max_bins:
+        # One bin per value: cut halfway between neighbours
+        return (distinct[:-1] + distinct[1:]) / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, max_bins + 1)[1:-1]))
+
+
+class DriftReference:
+    """Cut points and training counts of every column, flattened into one array."""
+
+    def __init__(self, columns, cuts, offsets, counts):
+        self.columns = list(columns)
+        self.cuts = cuts
+        self.offsets = offsets
+        self.counts = counts
+
+    @classmethod
+    def fit(cls, X, columns, max_bins=MAX_BINS):
+        """Bin the training matrix ``X``, whose columns are named ``columns``."""
+        X = np.asarray(X, dtype="float32")
+        cuts = [_cut_points(X[:, column].astype("float64"), max_bins)
+                for column in range(X.shape[1])]
+        # Bins of a column: len(cuts) + 1 value bins, then the missing bin
+        offsets = np.cumsum([0] + [len(points) + 2 for points in cuts])
+        reference = cls(columns, cuts, offsets, np.zeros(offsets[-1], dtype=np.int64))
+        reference.counts = reference.bin_counts(X)
+        return reference
+
+    def bin_counts(self, X):
+        """Return the flat count per bin of the rows of ``X``."""
+        # One contiguous float64 row per column, compared with the cut points
+        values = np.asarray(X).T.astype("float64")
+        missing = np.isnan(values)
+        has_missing = missing.any(axis=1)
+        bins = np.empty(values.shape, dtype=np.intp)
+        for column, points in enumerate(self.cuts):
+            column_bins = bins[column]
+            if len(points) <= LINEAR_CUTS:
+                # A few vectorized comparisons beat a binary search per value
+                column_bins[:] = self.offsets[column]
+                for point in points:
+                    column_bins += values[column] >= point
+            else:
+                column_bins[:] = np.searchsorted(points, values[column], side="right")
+                column_bins += self.offsets[column]
+            if has_missing[column]:
+                column_bins[missing[column]] = self.offsets[column + 1] - 1
+        return np.bincount(bins.ravel(), minlength=self.offsets[-1])
+
+    def save(self, path):
+        np.savez(path, columns=np.array(self.columns), offsets=self.offsets, counts=self.counts,
+                 cuts=np.concatenate(self.cuts) if self.cuts else np.empty(0))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            offsets = arrays["offsets"]
+            # A column with b bins has b - 2 cut points
+            ends = np.cumsum(np.diff(offsets) - 2)
+            cuts = np.split(arrays["cuts"], ends[:-1])
+            return cls(arrays["columns"].tolist(), cuts, offsets, arrays["counts"])
+
+
+class DriftMonitor:
+    """Running bin counts of scored rows, compared with a ``DriftReference``."""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.counts = np.zeros_like(reference.counts)
+
+    @property
+    def n_rows(self):
+        return int(self.counts[:self.reference.offsets[1]].sum())
+
+    def update(self, X):
+        """Count the rows of ``X`` (columns as in the reference) and return the monitor."""
+        self.counts += self.reference.bin_counts(X)
+        return self
+
+    def merge(self, other):
+        """Add the counts of another monitor over the same reference."""
+        self.counts += other.counts
+        return self
+
+    def reset(self):
+        self.counts[:] = 0
+        return self
+
+    def scores(self):
+        """Return PSI, KS and the missing shares of every column, most drifted first."""
+        reference, offsets = self.reference, self.reference.offsets
+        rows = []
+        for column, (start, stop) in enumerate(zip(offsets[:-1], offsets[1:])):
+            expected = reference.counts[start:stop] / max(reference.counts[start:stop].sum(), 1)
+            actual = self.counts[start:stop] / max(self.counts[start:stop].sum(), 1)
+            floored_e = np.maximum(expected, PSI_FLOOR)
+            floored_a = np.maximum(actual, PSI_FLOOR)
+            rows.append({"column": reference.columns[column],
+                         "psi": np.sum((floored_a - floored_e) * np.log(floored_a / floored_e)),
+                         "ks": np.abs(np.cumsum(actual) - np.cumsum(expected)).max(),
+                         "missing": actual[-1], "missing_reference": expected[-1]})
+
+        table = pd.DataFrame(rows).set_index("column")
+        if not self.n_rows:
+            table[["psi", "ks", "missing"]] = np.nan
+        return table.sort_values("psi", ascending=False)
@@ -0,0 +1,5 @@
+"""Exploratory summaries and plots of the loan extract.
+
+The notebook's EDA section, reorganized so that every statistic is computed
+once from typed columns and plots only draw the precomputed results.
+"""
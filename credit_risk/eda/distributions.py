@@ -0,0 +1,238 @@
+"""Binned summaries of numeric columns for histogram and KDE plots.
+
+Instead of handing every row to ``plt.hist`` or ``sns.kdeplot``, the values
+are binned once with NumPy and the plots draw the bins: a histogram is its
+counts and edges, a KDE is the binned counts smoothed with a Gaussian
+kernel on a fixed grid.
+
+KDEs use linear binning (every value is split between its two nearest grid
+points) and one FFT convolution, so they cost O(n + grid log grid) instead
+of O(n * grid). The binning error of the density at any grid point is at
+most ``delta**2 / (8 * h**3 * sqrt(2 * pi))`` for grid spacing ``delta`` and
+bandwidth ``h``, i.e. ``(delta / h)**2 / 8`` of the kernel's peak; the grid
+is refined until that ratio is below ``rel_error``. With ``budget`` set,
+each class is first reduced to a uniform reservoir sample of at most
+``budget / n_classes`` values, which adds a sampling error of about
+``2 * sqrt(f / (2 * sqrt(pi) * m * h))`` (two standard errors) for a
+sample of ``m`` values.
+
+The summaries are plain arrays: ``save_summaries`` writes them to one
+``.npz`` file and ``compare_summaries`` compares two refreshes without the
+raw data.
+"""
+import numpy as np
+import pandas as pd
+
+# seaborn's kdeplot defaults
+KDE_GRID_SIZE = 200
+KDE_CUT = 3
+# Largest grid the error target may ask for
+MAX_GRID_SIZE = 1 << 14
+KDE_REL_ERROR = 1e-3
+
+
+def _finite(values):
+    values = np.asarray(values, dtype="float64")
+    return values[np.isfinite(values)]
+
+
+def histogram(values, bins=10, range=None):
+    """Return ``(counts, edges)`` of the non-missing ``values``, like ``plt.hist``."""
+    return np.histogram(_finite(values), bins=bins, range=range)
+
+
+def scott_bandwidth(values):
+    """Return the Gaussian kernel bandwidth of Scott's rule (seaborn's default)."""
+    return values.std(ddof=1) * len(values) ** (-1 / 5)
+
+
+def linear_binning(values, start, delta, grid_size):
+    """Return the weights of ``values`` split linearly over a regular grid."""
+    position = np.clip((values - start) / delta, 0, grid_size - 1)
+    left = np.minimum(position.astype(np.intp), grid_size - 2)
+    right_share = position - left
+    return (np.bincount(left, 1 - right_share, minlength=grid_size)
+            + np.bincount(left + 1, right_share, minlength=grid_size))
+
+
+def binning_error(delta, bandwidth):
+    """Return the largest density error that linear binning can introduce."""
+    return delta ** 2 / (8 * bandwidth ** 3 * np.sqrt(2 * np.pi))
+
+
+def binned_kde(values, grid_size=KDE_GRID_SIZE, cut=KDE_CUT, bandwidth=None,
+               rel_error=KDE_REL_ERROR):
+    """Return ``(grid, density, bandwidth)`` of a Gaussian KDE of ``values``.
+
+    The grid reaches ``cut`` bandwidths beyond the data, as in seaborn, and
+    has at least ``grid_size`` points: more if needed to keep the binning
+    error within ``rel_error`` of the kernel peak (up to ``MAX_GRID_SIZE``).
+    """
+    values = _finite(values)
+    if bandwidth is None:
+        bandwidth = scott_bandwidth(values)
+    if not bandwidth > 0:
+        bandwidth = 1.0
+
+    start, stop = values.min() - cut * bandwidth, values.max() + cut * bandwidth
+    needed = (stop - start) / (bandwidth * np.sqrt(8 * rel_error)) + 1
+    grid_size = int(min(max(grid_size, np.ceil(needed)), MAX_GRID_SIZE))
+    grid, delta = np.linspace(start, stop, grid_size, retstep=True)
+    weights = linear_binning(values, start, delta, grid_size)
+
+    # Kernel over every grid offset, so nothing inside the grid is truncated
+    offsets = np.arange(-(grid_size - 1), grid_size) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    n_fft = 1 << (3 * grid_size - 3).bit_length()
+    smoothed = np.fft.irfft(np.fft.rfft(weights, n_fft) * np.fft.rfft(kernel, n_fft), n_fft)
+    density = smoothed[grid_size - 1:2 * grid_size - 1]
+    density = np.maximum(density, 0) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density, bandwidth
+
+
+class Reservoir:
+    """Uniform sample of at most ``size`` values from a stream of chunks (Algorithm R)."""
+
+    def __init__(self, size, random_state=0):
+        self.size = size
+        self.seen = 0
+        self.values = np.empty(0)
+        self._rng = np.random.default_rng(random_state)
+
+    def update(self, values):
+        values = _finite(values)
+        fill = min(self.size - len(self.values), len(values))
+        self.values = np.concatenate([self.values, values[:fill]])
+        self.seen += fill
+
+        rest = values[fill:]
+        if len(rest):
+            # Item number t replaces a random slot with probability size / t;
+            # later items overwrite earlier ones, as in the sequential version
+            seen = self.seen + np.arange(1, len(rest) + 1)
+            slots = (self._rng.random(len(rest)) * seen).astype(np.int64)
+            kept = slots < self.size
+            self.values[slots[kept]] = rest[kept]
+            self.seen += len(rest)
+        return self
+
+    def merge(self, other):
+        """Fold in the reservoir of another stream, as if both had been one."""
+        seen = self.seen + other.seen
+        size = min(self.size, seen)
+        if len(self.values) + len(other.values) <= size:
+            self.values = np.concatenate([self.values, other.values])
+        else:
+            # How many of the merged sample come from each stream follows
+            # their shares of everything seen
+            mine = self._rng.hypergeometric(self.seen, other.seen, size)
+            self.values = np.concatenate([
+                self._rng.choice(self.values, mine, replace=False),
+                self._rng.choice(other.values, size - mine, replace=False),
+            ])
+        self.seen = seen
+        return self
+
+
+def class_kdes(values, labels, classes, budget=None, bandwidth=None, random_state=0,
+               **kde_kwargs):
+    """Return ``{class: summary}`` of the KDE of ``values`` per label.
+
+    Each summary holds the "grid", the "density" scaled by the share of its
+    class (what ``sns.kdeplot(..., hue=...)`` draws by default), the
+    "bandwidth", the number of values "n" and "sample_size", and
+    "error_bound", the bound on the density error from the module docstring.
+    """
+    values = np.asarray(values, dtype="float64")
+    labels = np.asarray(labels)
+    kept = np.isfinite(values)
+    per_class = None if budget is None else max(2, budget // len(classes))
+    kdes = {}
+    for label in classes:
+        members = values[kept & (labels == label)]
+        n = len(members)
+        if n < 2:
+            continue
+        # The bandwidth always comes from the whole class, so a sample
+        # estimates the same smoothed density, only with more noise
+        class_bandwidth = bandwidth or scott_bandwidth(members)
+        if per_class is not None and n > per_class:
+            members = Reservoir(per_class, random_state).update(members).values
+
+        grid, density, class_bandwidth = binned_kde(members, bandwidth=class_bandwidth,
+                                                    **kde_kwargs)
+        error = binning_error(grid[1] - grid[0], class_bandwidth)
+        if len(members) < n:
+            error += 2 * np.sqrt(density.max()
+                                 / (2 * np.sqrt(np.pi) * len(members) * class_bandwidth))
+        share = n / kept.sum()
+        kdes[label] = {"grid": grid, "density": density * share, "bandwidth": class_bandwidth,
+                       "n": n, "sample_size": len(members), "error_bound": error * share}
+    return kdes
+
+
+def save_summaries(path, summaries):
+    """Write ``{column: {"histogram": (counts, edges), "kdes": {class: summary}}}`` to ``path``."""
+    arrays = {}
+    for column, summary in summaries.items():
+        if "histogram" in summary:
+            arrays[f"{column}/hist/counts"], arrays[f"{column}/hist/edges"] = summary["histogram"]
+        for label, kde in summary.get("kdes", {}).items():
+            for name, value in kde.items():
+                arrays[f"{column}/kde/{label}/{name}"] = np.asarray(value)
+    np.savez_compressed(path, **arrays)
+
+
+def load_summaries(path):
+    """Read summaries written by ``save_summaries``."""
+    summaries = {}
+    with np.load(path) as arrays:
+        for key in arrays.files:
+            column, kind, *rest = key.split("/")
+            summary = summaries.setdefault(column, {})
+            if kind == "hist":
+                summary.setdefault("hist", {})[rest[0]] = arrays[key]
+            else:
+                label, name = rest
+                value = arrays[key]
+                summary.setdefault("kdes", {}).setdefault(label, {})[name] = (
+                    value if value.ndim else value.item()
+                )
+
+    for summary in summaries.values():
+        if "hist" in summary:
+            hist = summary.pop("hist")
+            summary["histogram"] = hist["counts"], hist["edges"]
+    return summaries
+
+
+def _histogram_l1(old, new):
+    """Return the L1 distance of two normalized histograms over their merged edges."""
+    (old_counts, old_edges), (new_counts, new_edges) = old, new
+    edges = np.union1d(old_edges, new_edges)
+    shares = [np.diff(np.interp(edges, bin_edges, np.append(0, np.cumsum(counts)) / counts.sum()))
+              for counts, bin_edges in ((old_counts, old_edges), (new_counts, new_edges))]
+    return np.abs(shares[0] - shares[1]).sum()
+
+
+def compare_summaries(old, new):
+    """Return how much each column's distribution moved between two refreshes.
+
+    "hist_l1" is the L1 distance between the normalized histograms, with
+    both spread uniformly within their bins when the edges differ;
+    "kde_max_diff" is the largest density difference of any class, with the
+    old KDE interpolated onto the new grid.
+    """
+    rows = []
+    for column in sorted(old.keys() & new.keys()):
+        row = {"column": column, "hist_l1": np.nan, "kde_max_diff": np.nan}
+        if "histogram" in old[column] and "histogram" in new[column]:
+            row["hist_l1"] = _histogram_l1(old[column]["histogram"], new[column]["histogram"])
+        for label in old[column].get("kdes", {}).keys() & new[column].get("kdes", {}).keys():
+            before, after = old[column]["kdes"][label], new[column]["kdes"][label]
+            moved = np.abs(np.interp(after["grid"], before["grid"], before["density"],
+                                     left=0, right=0) - after["density"]).max()
+            row["kde_max_diff"] = np.fmax(row["kde_max_diff"], moved)
+        rows.append(row)
+
+    return pd.DataFrame(rows, columns=["column", "hist_l1", "kde_max_diff"]).set_index("column")
@@ -0,0 +1,51 @@
+"""The frame the notebook's EDA section looks at, and its field groups."""
+from credit_risk.loader import iter_loan_chunks, load_loan_data
+from credit_risk.schema import EDA_SCHEMA, SCHEMA
+from credit_risk.transforms import (derive_dates, filter_resolved, flag_major_derogatory,
+                                    label_risk, map_emp_length)
+
+# Fields plotted with field_risk_vis after the emp_length / date conversion,
+# and in the categorical part of the "Visualization" section
+DATE_FIELDS = ["emp_length", "earliest_cr_line", "yr_since_last_inq"]
+CATEGORICAL_FIELDS = ["grade", "sub_grade", "home_ownership",
+                      "verification_status", "purpose", "addr_state",
+                      "initial_list_status"]
+# "nunique() < 10" picks the first batch of field_risk_vis plots
+MAX_LOW_CARDINALITY = 10
+
+
+def load_eda_frame(path, **read_csv_kwargs):
+    """Load the resolved loans with the exploratory columns, as the EDA sees them.
+
+    Unlike the modelling pipeline this keeps the categorical fields as
+    labels and the columns the notebook drops after looking at them.
+    """
+    return prepare_eda_frame(load_loan_data(path, schema={**SCHEMA, **EDA_SCHEMA},
+                                            **read_csv_kwargs))
+
+
+def iter_eda_chunks(path, chunksize=100_000, **read_csv_kwargs):
+    """Yield ``load_eda_frame`` of ``path`` in chunks of at most ``chunksize`` source rows."""
+    for chunk in iter_loan_chunks(path, chunksize, schema={**SCHEMA, **EDA_SCHEMA},
+                                  **read_csv_kwargs):
+        yield prepare_eda_frame(chunk)
+
+
+def prepare_eda_frame(frame):
+    """Apply the row-wise EDA steps to ``frame``, read with ``SCHEMA`` and ``EDA_SCHEMA``."""
+    frame = filter_resolved(frame).copy()
+    frame = label_risk(frame)
+    frame = frame.drop(columns="loan_status")
+    frame = flag_major_derogatory(frame)
+    frame = map_emp_length(frame)
+    return derive_dates(frame)
+
+
+def low_cardinality_fields(frame, max_unique=MAX_LOW_CARDINALITY, target="loan_risk_est"):
+    """Return the fields with 2 to ``max_unique - 1`` distinct values, fewest first.
+
+    Uniform columns ("policy_code", "application_type") are left out, as
+    the notebook drops them before plotting.
+    """
+    counts = frame.drop(columns=target).nunique().sort_values(kind="stable")
+    return list(counts[(counts > 1) & (counts < max_unique)].index)
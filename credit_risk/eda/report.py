@@ -0,0 +1,198 @@
+"""Headless EDA report: every figure of the notebook's EDA section as PNG.
+
+Usage::
+
+    python -m credit_risk.eda.report loan_data_2007_2014.csv report/
+
+The statistics behind each figure (risk tables, histogram bins, binned
+KDEs, the correlation matrix) are computed once in the parent process;
+the figures are then drawn with the Agg backend in a process pool and
+written to the output directory together with an ``index.html``. The
+histogram and KDE arrays are also saved as ``summaries.npz``, so a later
+refresh can be compared against them with
+``credit_risk.eda.distributions.compare_summaries``.
+"""
+import argparse
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from credit_risk.eda.distributions import class_kdes, histogram, save_summaries
+from credit_risk.eda.frame import CATEGORICAL_FIELDS, DATE_FIELDS, load_eda_frame, low_cardinality_fields
+from credit_risk.eda.risk import plot_risk_profile, risk_profiles
+from credit_risk.pipeline import NUM_COLS
+
+RISK_CLASSES = ["good", "risky"]
+# The notebook's kdeplot filters on the columns it drops afterwards
+KDE_RANGES = {"tot_coll_amt": (0, 100000),
+              "tot_cur_bal": (None, 800000),
+              "total_rev_hi_lim": (None, 250000)}
+
+
+def _figure(section, name, kind, title, figsize=(7, 5), **data):
+    return {"section": section, "name": name, "kind": kind, "title": title,
+            "figsize": figsize, **data}
+
+
+def _in_range(values, low, high):
+    kept = np.ones(len(values), dtype=bool)
+    if low is not None:
+        kept &= values > low
+    if high is not None:
+        kept &= values < high
+    return kept
+
+
+def summarize(frame, target="loan_risk_est", kde_budget=None):
+    """Return the figure specs of the report: a title plus precomputed data each.
+
+    ``kde_budget`` caps the values per KDE plot (see ``class_kdes``).
+    """
+    labels = frame[target].to_numpy()
+    figures = [_figure("Data Preparation", "risk_balance", "bar",
+                       "Credit Risk Estimation Visualization",
+                       labels=RISK_CLASSES,
+                       heights=[int((labels == label).sum()) for label in RISK_CLASSES])]
+
+    for column, (low, high) in KDE_RANGES.items():
+        values = frame[column].to_numpy(dtype="float64")
+        kept = _in_range(values, low, high)
+        figures.append(_figure("Cleaning", f"kde_{column}", "kde", column,
+                               kdes=class_kdes(values[kept], labels[kept], RISK_CLASSES,
+                                               budget=kde_budget)))
+
+    low_cardinality = low_cardinality_fields(frame, target=target)
+    fields = list(dict.fromkeys(low_cardinality + DATE_FIELDS + CATEGORICAL_FIELDS))
+    profiles = risk_profiles(frame, fields, target=target)
+    for field in low_cardinality:
+        figures.append(_figure("Categorizing", f"risk_{field}", "risk", field,
+                               table=profiles[field]))
+    for field in DATE_FIELDS:
+        figures.append(_figure("Visualization", f"risk_{field}", "risk", field,
+                               table=profiles[field]))
+
+    for column in NUM_COLS:
+        counts, edges = histogram(frame[column].to_numpy())
+        figures.append(_figure("Numeric", f"hist_{column}", "hist", column,
+                               counts=counts, edges=edges))
+    figures.append(_figure("Numeric", "correlation", "heatmap", "Correlation matrix",
+                           figsize=(12, 6), corr=frame[NUM_COLS].corr()))
+
+    for field in CATEGORICAL_FIELDS:
+        figures.append(_figure("Categorical", f"risk_{field}", "risk", field, figsize=(12, 4),
+                               table=profiles[field]))
+
+    return figures
+
+
+def _draw(figure, ax):
+    kind = figure["kind"]
+    if kind == "bar":
+        ax.bar(figure["labels"], figure["heights"])
+        ax.set_xlabel("Credit Risk Status")
+        ax.set_ylabel("Numbers (est.)")
+    elif kind == "kde":
+        for label, kde in figure["kdes"].items():
+            ax.plot(kde["grid"], kde["density"], label=label)
+        ax.set_xlabel(figure["title"])
+        ax.set_ylabel("Density")
+        ax.legend(title="loan_risk_est")
+    elif kind == "risk":
+        plot_risk_profile(figure["table"], ax)
+    elif kind == "hist":
+        edges = figure["edges"]
+        ax.stairs(figure["counts"], edges, fill=True)
+    elif kind == "heatmap":
+        corr = figure["corr"]
+        image = ax.imshow(corr.to_numpy(), cmap="coolwarm", vmin=-1, vmax=1)
+        ax.figure.colorbar(image, ax=ax)
+        ax.set_xticks(range(len(corr)), corr.columns, rotation=90, fontsize=7)
+        ax.set_yticks(range(len(corr)), corr.index, fontsize=7)
+        for (i, j), value in np.ndenumerate(corr.to_numpy()):
+            ax.text(j, i, f"{value:.2f}", ha="center", va="center", fontsize=5)
+    else:
+        raise ValueError(f"unknown figure kind {kind!r}")
+    ax.set_title(figure["title"])
+
+
+def render_figure(figure, directory):
+    """Draw one figure spec with the Agg backend and save it as PNG; return the file name."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figure["figsize"])
+    try:
+        _draw(figure, ax)
+        fig.tight_layout()
+        filename = f"{figure['name']}.png"
+        fig.savefig(os.path.join(directory, filename))
+    finally:
+        plt.close(fig)
+    return filename
+
+
+def write_index(figures, filenames, directory):
+    """Write ``index.html`` listing the figures section by section."""
+    parts = ["<!DOCTYPE html>", "<html><head><meta charset=\"utf-8\">",
+             "<title>Credit risk EDA</title></head><body>", "<h1>Credit risk EDA</h1>"]
+    section = None
+    for figure, filename in zip(figures, filenames):
+        if figure["section"] != section:
+            section = figure["section"]
+            parts.append(f"<h2>{html.escape(section)}</h2>")
+        title = html.escape(figure["title"])
+        parts.append(f"<figure><img src=\"{html.escape(filename)}\" alt=\"{title}\">"
+                     f"<figcaption>{title}</figcaption></figure>")
+    parts.append("</body></html>")
+
+    path = os.path.join(directory, "index.html")
+    with open(path, "w") as f:
+        f.write("\n".join(parts) + "\n")
+    return path
+
+
+def figure_summaries(figures):
+    """Return the histogram and KDE arrays of ``figures``, keyed by column."""
+    summaries = {}
+    for figure in figures:
+        if figure["kind"] == "hist":
+            summaries.setdefault(figure["title"], {})["histogram"] = (figure["counts"],
+                                                                      figure["edges"])
+        elif figure["kind"] == "kde":
+            summaries.setdefault(figure["title"], {})["kdes"] = figure["kdes"]
+    return summaries
+
+
+def render_report(frame, directory, max_workers=None, kde_budget=None):
+    """Render every EDA figure of ``frame`` into ``directory``; return the index path."""
+    os.makedirs(directory, exist_ok=True)
+    figures = summarize(frame, kde_budget=kde_budget)
+    save_summaries(os.path.join(directory, "summaries.npz"), figure_summaries(figures))
+    if max_workers == 1:
+        filenames = [render_figure(figure, directory) for figure in figures]
+    else:
+        with ProcessPoolExecutor(max_workers) as executor:
+            filenames = list(executor.map(render_figure, figures, [directory] * len(figures)))
+    return write_index(figures, filenames, directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the EDA figures headlessly.")
+    parser.add_argument("path")
+    parser.add_argument("directory")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--kde-budget", type=int, default=None,
+                        help="sample at most this many values per KDE plot")
+    args = parser.parse_args(argv)
+
+    index = render_report(load_eda_frame(args.path), args.directory, args.max_workers,
+                          args.kde_budget)
+    print(f"Wrote {index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Share of risky loans per field value, as plotted by ``field_risk_vis``.
+
+The notebook's ``field_risk_vis(field)`` runs
+``groupby(field)["loan_risk_est"].value_counts(normalize=True)`` on string
+labels for every field it plots. ``risk_profiles`` computes the tables of
+all requested fields together: each field is reduced to integer codes, the
+codes of all fields are shifted into one id space, and a single pass over
+the rows counts loans and risky loans per id with ``np.bincount``.
+``plot_risk_profile`` then only draws a precomputed table.
+"""
+import numpy as np
+import pandas as pd
+
+RISKY_PERCENTAGE = "Risky Percentage"
+
+
+def _codes(series):
+    """Return ``(codes, values)`` of ``series``, sorted like ``groupby`` keys."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series, sort=True)
+
+
+def risk_profiles(frame, fields, target="loan_risk_est", positive="risky",
+                  block_rows=1_000_000):
+    """Return ``{field: table}`` with the loans and risky share per value of each field.
+
+    Every table is indexed by the field's values, in ``groupby`` order and
+    without missing values, and has the columns "loans", "risky" and
+    "Risky Percentage". Values without any risky loan show 0% (the
+    notebook's ``value_counts`` leaves them out). Rows are counted in blocks
+    of ``block_rows``, so the stacked ids never take more than
+    ``len(fields) * block_rows`` integers.
+    """
+    risky = (frame[target] == positive).to_numpy()
+    codes, values, offsets = [], [], [0]
+    for field in fields:
+        field_codes, field_values = _codes(frame[field])
+        codes.append(field_codes)
+        values.append(field_values)
+        # One extra slot per field collects its missing values
+        offsets.append(offsets[-1] + len(field_values) + 1)
+
+    loans = np.zeros(offsets[-1], dtype=np.int64)
+    risky_loans = np.zeros(offsets[-1], dtype=np.int64)
+    for start in range(0, len(frame), block_rows):
+        stop = start + block_rows
+        ids = np.empty((len(fields), len(risky[start:stop])), dtype=np.int64)
+        for i, field_codes in enumerate(codes):
+            block = field_codes[start:stop].astype(np.int64)
+            ids[i] = np.where(block < 0, len(values[i]), block) + offsets[i]
+        ids = ids.ravel()
+        loans += np.bincount(ids, minlength=offsets[-1])
+        risky_loans += np.bincount(ids[np.tile(risky[start:stop], len(fields))],
+                                   minlength=offsets[-1])
+
+    profiles = {}
+    for i, field in enumerate(fields):
+        slots = slice(offsets[i], offsets[i + 1] - 1)
+        table = pd.DataFrame({"loans": loans[slots], "risky": risky_loans[slots]},
+                             index=pd.Index(np.asarray(values[i]), name=field))
+        table = table[table["loans"] > 0]
+        table[RISKY_PERCENTAGE] = table["risky"] / table["loans"] * 100
+        profiles[field] = table
+
+    return profiles
+
+
+def plot_risk_profile(table, ax=None):
+    """Draw the risky percentage per value of one ``risk_profiles`` table."""
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    x = table.index
+    if not pd.api.types.is_numeric_dtype(x):
+        x = x.astype(str)
+    ax.plot(x, table[RISKY_PERCENTAGE])
+    ax.set_xlabel(table.index.name)
+    ax.set_ylabel(RISKY_PERCENTAGE)
+    ax.set_title(table.index.name)
+    return ax
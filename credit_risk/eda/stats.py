@@ -0,0 +1,220 @@
+"""One-pass, mergeable summaries of numeric columns: corr, pivot tables, describe.
+
+The notebook scans the materialized frame once per summary:
+``num_loan_data.corr()`` for the heatmap, ``pd.pivot_table(...,
+index="loan_risk_est")`` with the mean and ``np.max``, and ``describe()``
+on several column groups. ``StatsAccumulator`` gathers everything these
+need in a single pass over chunks, per class of the ``by`` column:
+
+* pairwise counts, means, squared deviations and co-moments, kept for
+  every pair of columns over the rows where both are present (the
+  pairwise-complete statistics ``DataFrame.corr()`` uses);
+* minimum and maximum;
+* a reservoir sample per column for the quartiles of ``describe()``,
+  exact while a column has at most ``sample_size`` values.
+
+Each chunk is reduced to these statistics with a few matrix products
+after centering on its own means, and statistics are combined with the
+parallel update of Chan et al., so two accumulators (chunks, files,
+processes) merge exactly, in any order. ``profile_files`` runs one
+accumulator per extract in a process pool and merges them.
+
+Usage::
+
+    python -m credit_risk.eda.stats loan_data_2007_2014.csv --chunksize 100000
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.eda.distributions import Reservoir
+from credit_risk.eda.frame import iter_eda_chunks
+from credit_risk.pipeline import NUM_COLS
+
+# Values per column kept for the quartiles of describe()
+QUANTILE_SAMPLE = 100_000
+AGGREGATES = ("count", "mean", "std", "min", "max")
+
+
+def _moments(values):
+    """Return the pairwise ``(n, mean, m2, comoment)`` of a float64 array with NaNs.
+
+    ``n[i, j]`` counts the rows where columns i and j are both present;
+    ``mean[i, j]`` and ``m2[i, j]`` are the mean and sum of squared
+    deviations of column i over those rows, ``comoment[i, j]`` the sum of
+    products of the deviations of i and j.
+    """
+    present = ~np.isnan(values)
+    weights = present.astype("float64")
+    # Centering on the chunk's own means keeps the sums below small
+    filled = np.where(present, values, 0)
+    shift = filled.sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+    centered = np.where(present, filled - shift, 0)
+
+    n = weights.T @ weights
+    sums = centered.T @ weights
+    squares = (centered ** 2).T @ weights
+    products = centered.T @ centered
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = np.where(n > 0, sums / n, 0)
+        m2 = np.where(n > 0, squares - sums * offset, 0)
+        comoment = np.where(n > 0, products - sums * offset.T, 0)
+    return n, offset + shift[:, None], m2, comoment
+
+
+def _merge_moments(a, b):
+    """Combine two ``_moments`` results as if computed over both row sets."""
+    n_a, mean_a, m2_a, co_a = a
+    n_b, mean_b, m2_b, co_b = b
+    n = n_a + n_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(n > 0, n_b / n, 0)
+        weight = np.where(n > 0, n_a * n_b / n, 0)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * share
+    m2 = m2_a + m2_b + delta ** 2 * weight
+    comoment = co_a + co_b + delta * delta.T * weight
+    return n, mean, m2, comoment
+
+
+class StatsAccumulator:
+    """Mergeable statistics of ``columns``, overall and per value of ``by``."""
+
+    def __init__(self, columns=NUM_COLS, by="loan_risk_est", sample_size=QUANTILE_SAMPLE,
+                 random_state=0):
+        self.columns = list(columns)
+        self.by = by
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.classes = {}
+        self.reservoirs = [Reservoir(sample_size, random_state + i)
+                           for i in range(len(self.columns))]
+
+    def update(self, frame):
+        """Add the rows of ``frame`` and return the accumulator."""
+        values = frame[self.columns].to_numpy(dtype="float64")
+        for column, reservoir in enumerate(self.reservoirs):
+            reservoir.update(values[:, column])
+
+        if self.by is None:
+            groups = {None: np.arange(len(values))}
+        else:
+            groups = frame.groupby(self.by, observed=True).indices
+        for label, rows in groups.items():
+            part = values[rows]
+            stats = {"moments": _moments(part),
+                     "min": np.fmin.reduce(part, axis=0, initial=np.inf),
+                     "max": np.fmax.reduce(part, axis=0, initial=-np.inf)}
+            self.classes[label] = (stats if label not in self.classes
+                                   else self._merge_stats(self.classes[label], stats))
+        return self
+
+    @staticmethod
+    def _merge_stats(a, b):
+        return {"moments": _merge_moments(a["moments"], b["moments"]),
+                "min": np.fmin(a["min"], b["min"]),
+                "max": np.fmax(a["max"], b["max"])}
+
+    def merge(self, other):
+        """Fold in an accumulator of the same columns over other rows."""
+        if other.columns != self.columns or other.by != self.by:
+            raise ValueError("can only merge accumulators of the same columns and by")
+        for label, stats in other.classes.items():
+            self.classes[label] = (stats if label not in self.classes
+                                   else self._merge_stats(self.classes[label], stats))
+        for reservoir, theirs in zip(self.reservoirs, other.reservoirs):
+            reservoir.merge(theirs)
+        return self
+
+    def _stats(self, label=None):
+        if label is not None:
+            return self.classes[label]
+        return reduce(self._merge_stats, self.classes.values())
+
+    def _column_summary(self, stats):
+        n, mean, m2, _ = stats["moments"]
+        count = np.diag(n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.where(count > 1, np.sqrt(np.diag(m2) / (count - 1)), np.nan)
+        empty = count == 0
+        return {"count": count, "mean": np.where(empty, np.nan, np.diag(mean)), "std": std,
+                "min": np.where(empty, np.nan, stats["min"]),
+                "max": np.where(empty, np.nan, stats["max"])}
+
+    def corr(self, label=None):
+        """Return the Pearson correlations like ``DataFrame.corr()``, of one class or all rows."""
+        n, _, m2, comoment = self._stats(label)["moments"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.clip(comoment / np.sqrt(m2 * m2.T), -1, 1)
+        corr[n < 2] = np.nan
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def pivot(self, aggfunc="mean"):
+        """Return ``pd.pivot_table(frame, index=by, values=columns, aggfunc=aggfunc)``.
+
+        ``aggfunc`` is one of ``AGGREGATES``; like ``pivot_table``, the
+        columns come out sorted by name.
+        """
+        if aggfunc not in AGGREGATES:
+            raise ValueError(f"aggfunc must be one of {AGGREGATES}, got {aggfunc!r}")
+        labels = sorted(self.classes)
+        table = pd.DataFrame([self._column_summary(self.classes[label])[aggfunc]
+                              for label in labels],
+                             index=pd.Index(labels, name=self.by), columns=self.columns)
+        return table[sorted(self.columns)]
+
+    def describe(self):
+        """Return ``frame[columns].describe()``; quartiles are exact up to ``sample_size`` values."""
+        summary = self._column_summary(self._stats())
+        quartiles = np.array([np.percentile(reservoir.values, [25, 50, 75])
+                              if len(reservoir.values) else [np.nan] * 3
+                              for reservoir in self.reservoirs])
+        rows = {"count": summary["count"], "mean": summary["mean"], "std": summary["std"],
+                "min": summary["min"], "25%": quartiles[:, 0], "50%": quartiles[:, 1],
+                "75%": quartiles[:, 2], "max": summary["max"]}
+        return pd.DataFrame(rows, index=self.columns).T
+
+
+def profile_csv(path, columns=NUM_COLS, by="loan_risk_est", chunksize=100_000,
+                sample_size=QUANTILE_SAMPLE, random_state=0):
+    """Return a ``StatsAccumulator`` of the extract at ``path``, read chunk by chunk."""
+    accumulator = StatsAccumulator(columns, by, sample_size, random_state)
+    for chunk in iter_eda_chunks(path, chunksize):
+        accumulator.update(chunk)
+    return accumulator
+
+
+def profile_files(paths, columns=NUM_COLS, by="loan_risk_est", chunksize=100_000,
+                  sample_size=QUANTILE_SAMPLE, max_workers=None):
+    """Profile every extract in ``paths`` in its own process and merge the results."""
+    with ProcessPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(profile_csv, path, columns, by, chunksize, sample_size, seed)
+                   for seed, path in enumerate(paths)]
+        return reduce(StatsAccumulator.merge, (future.result() for future in futures))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile loan extracts in one pass.")
+    parser.add_argument("paths", nargs="+", help="extracts (shards) to profile and merge")
+    parser.add_argument("--columns", nargs="+", default=NUM_COLS)
+    parser.add_argument("--by", default="loan_risk_est")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--max-workers", type=int)
+    args = parser.parse_args(argv)
+
+    accumulator = profile_files(args.paths, args.columns, args.by, args.chunksize,
+                                max_workers=args.max_workers)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(accumulator.describe().to_string(float_format="{:.3f}".format))
+        for aggfunc in ("mean", "max"):
+            print(f"\npivot_table({args.by}, aggfunc={aggfunc})")
+            print(accumulator.pivot(aggfunc).to_string(float_format="{:.3f}".format))
+        print("\ncorr")
+        print(accumulator.corr().to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
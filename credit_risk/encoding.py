@@ -0,0 +1,186 @@
+"""Ordinal and one-hot encoding of the categorical loan fields.
+
+``CategoricalEncoder`` replaces the notebook's ``grade_map`` / ``addr_st_map``
+loops, their ``.map()`` calls and ``pd.get_dummies`` + ``pd.concat``. The
+vocabularies of every field are learned in one ``fit`` and stored as plain
+lists, so the exact same encoding can be replayed at scoring time.
+"""
+import numpy as np
+import pandas as pd
+
+UNKNOWN_ORDINAL = 0
+
+
+def _factorize(series):
+    """Return ``(codes, uniques)`` of ``series``, with code -1 for missing values.
+
+    Category columns already carry both, other columns are hashed once.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series)
+
+
+def _vocabulary(codes, uniques):
+    """Return the sorted distinct values that ``codes`` refers to."""
+    used = np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0
+    return sorted(uniques[used])
+
+
+class CategoricalEncoder:
+    """Encode ``ordinal`` fields as 1..n and ``onehot`` fields as dummies.
+
+    Ordinal codes follow the sorted vocabulary and start at 1, like the
+    notebook's maps, leaving 0 for missing values and values not seen during
+    ``fit``; those also get an all-zero dummy row. With
+    ``handle_unknown="error"``, unseen (non-missing) values raise
+    ``ValueError`` instead.
+    """
+
+    def __init__(self, ordinal=(), onehot=(), handle_unknown="ignore"):
+        if handle_unknown not in ("ignore", "error"):
+            raise ValueError(f"handle_unknown must be 'ignore' or 'error', got {handle_unknown!r}")
+
+        self.ordinal = list(ordinal)
+        self.onehot = list(onehot)
+        self.handle_unknown = handle_unknown
+
+    def fit(self, frame):
+        """Learn the vocabulary of every field from ``frame``."""
+        return self._fit(self._factorized(frame))
+
+    def _factorized(self, frame):
+        return {field: _factorize(frame[field]) for field in self.ordinal + self.onehot}
+
+    def _fit(self, factorized):
+        self.vocabularies_ = {field: _vocabulary(*factorized[field])
+                              for field in self.ordinal + self.onehot}
+        return self
+
+    @property
+    def ordinal_names_(self):
+        return list(self.ordinal)
+
+    @property
+    def onehot_names_(self):
+        return [f"{field}_{value}" for field in self.onehot
+                for value in self.vocabularies_[field]]
+
+    @property
+    def feature_names_(self):
+        return self.ordinal_names_ + self.onehot_names_
+
+    def _indices(self, field, codes, uniques):
+        """Return each row's position in the vocabulary of ``field``, -1 if unseen."""
+        table = pd.Index(self.vocabularies_[field]).get_indexer(uniques)
+        # Missing values have code -1; append a -1 for them to pick up
+        table = np.append(table, -1)
+        indices = table[codes]
+
+        if self.handle_unknown == "error":
+            unseen = (indices < 0) & (codes >= 0)
+            if unseen.any():
+                unseen = list(uniques[np.unique(codes[unseen])])
+                raise ValueError(f"Unseen values in {field!r}: {unseen}")
+
+        return indices
+
+    def _output(self, frame, out, width, dtype):
+        if out is None:
+            return np.zeros((len(frame), width), dtype=dtype)
+        if out.shape != (len(frame), width):
+            raise ValueError(f"out has shape {out.shape}, expected {(len(frame), width)}")
+        return out
+
+    def _write_ordinal(self, factorized, out):
+        for j, field in enumerate(self.ordinal):
+            # Unseen and missing values (index -1) land on UNKNOWN_ORDINAL
+            out[:, j] = self._indices(field, *factorized[field]) + 1
+
+    def _positions(self, factorized, n_rows):
+        """Return each row's dummy column per one-hot field, -1 for none."""
+        positions = np.empty((n_rows, len(self.onehot)), dtype=np.int32)
+        offset = 0
+        for j, field in enumerate(self.onehot):
+            indices = self._indices(field, *factorized[field])
+            positions[:, j] = np.where(indices >= 0, offset + indices, -1)
+            offset += len(self.vocabularies_[field])
+        return positions
+
+    def _write_onehot(self, factorized, out):
+        rows = np.arange(len(out))
+        offset = 0
+        for field in self.onehot:
+            indices = self._indices(field, *factorized[field])
+            known = indices >= 0
+            out[rows[known], offset + indices[known]] = 1
+            offset += len(self.vocabularies_[field])
+
+    def transform_ordinal(self, frame, out=None, dtype="float32"):
+        """Write the ordinal codes of ``frame`` into ``out`` (allocated if None)."""
+        out = self._output(frame, out, len(self.ordinal), dtype)
+        self._write_ordinal({field: _factorize(frame[field]) for field in self.ordinal}, out)
+        return out
+
+    def transform_onehot(self, frame, out=None, dtype="float32"):
+        """Write the dummies of ``frame`` into ``out`` (allocated if None).
+
+        A given ``out`` must be zero-filled; only the ones are written.
+        """
+        out = self._output(frame, out, len(self.onehot_names_), dtype)
+        self._write_onehot({field: _factorize(frame[field]) for field in self.onehot}, out)
+        return out
+
+    def onehot_positions(self, frame):
+        """Return the column of each row's dummy, one column per one-hot field.
+
+        Columns count from the first dummy, as in ``onehot_names_``; -1 marks
+        a missing or unseen value (no dummy set).
+        """
+        return self._positions({field: _factorize(frame[field]) for field in self.onehot},
+                               len(frame))
+
+    def transform_onehot_sparse(self, frame, dtype="float32"):
+        """Return the dummies of ``frame`` as a CSR matrix, storing only the ones."""
+        from scipy import sparse
+
+        positions = self.onehot_positions(frame)
+        known = positions >= 0
+        indptr = np.zeros(len(frame) + 1, dtype=np.int64)
+        np.cumsum(known.sum(axis=1), out=indptr[1:])
+        return sparse.csr_matrix((np.ones(known.sum(), dtype=dtype), positions[known], indptr),
+                                 shape=(len(frame), len(self.onehot_names_)))
+
+    def transform(self, frame, out=None, dtype="float32"):
+        """Return the ordinal codes followed by the dummies, as one array.
+
+        A given ``out`` must be zero-filled, as for ``transform_onehot``.
+        """
+        return self._transform(frame, self._factorized(frame), out, dtype)
+
+    def _transform(self, frame, factorized, out, dtype):
+        out = self._output(frame, out, len(self.feature_names_), dtype)
+        n_ordinal = len(self.ordinal)
+        self._write_ordinal(factorized, out[:, :n_ordinal])
+        self._write_onehot(factorized, out[:, n_ordinal:])
+        return out
+
+    def fit_transform(self, frame, out=None, dtype="float32"):
+        """``fit`` then ``transform``, hashing each column only once."""
+        factorized = self._factorized(frame)
+        return self._fit(factorized)._transform(frame, factorized, out, dtype)
+
+    def to_dict(self):
+        """Return the fitted encoder as JSON-serialisable data."""
+        return {"ordinal": self.ordinal,
+                "onehot": self.onehot,
+                "handle_unknown": self.handle_unknown,
+                "vocabularies": {field: list(vocabulary)
+                                 for field, vocabulary in self.vocabularies_.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an encoder saved with ``to_dict``."""
+        encoder = cls(data["ordinal"], data["onehot"], data["handle_unknown"])
+        encoder.vocabularies_ = dict(data["vocabularies"])
+        return encoder
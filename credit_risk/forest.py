@@ -0,0 +1,197 @@
+"""Array-based inference for the fitted DecisionTree / RandomForest models.
+
+``CompiledForest`` flattens every tree of a fitted sklearn classifier into
+one set of contiguous node arrays (feature, threshold, children, class
+probabilities) and predicts by walking all trees for the whole batch at
+once, one tree level per step. Leaves point back to themselves, which is
+how the walk tells them apart; (tree, row) pairs that reached a leaf drop
+out of the next step, so the cost follows the average leaf depth rather
+than the deepest tree.
+
+The walk is NumPy code, one array operation per level, against sklearn's
+compiled loop per row: it is faster on small batches only. With the
+forest used by ``benchmarks/bench_forest.py`` (100 fully grown trees),
+it beats sklearn up to about 64 rows and loses beyond that, 2-3x at a
+few thousand rows; a single decision tree is faster in sklearn at any
+batch size. (Stepping every row of a tree through a fixed number
+of levels, without dropping finished pairs, is slower still.) So a
+``CompiledForest`` given its sklearn ``estimator`` scores batches of more
+than ``max_batch`` rows (``COMPILED_MAX_BATCH`` by default), and every
+batch of a single tree, with the estimator; without one it walks every
+batch itself.
+
+The arrays are saved as plain ``.npy`` files and loaded with
+``np.load(mmap_mode="r")``: a scoring worker can start without unpickling
+the estimator. Since the walk only meets its goal on small batches,
+everything that loads a saved forest (``RiskScorer.load`` and each model
+of a ``SegmentedModel``) goes through ``load_tree_model``, which hands
+the estimator to the forest whenever it was kept, unless the compiled
+engine is asked for explicitly. Predictions are bit-identical to sklearn's: inputs are cast
+to float32 and compared with float64 thresholds as sklearn does, leaf
+values are normalized with the same division, and tree probabilities are
+summed in estimator order before dividing by the number of trees.
+"""
+import os
+import pickle
+
+import numpy as np
+
+TREE_LEAF = -1
+# What scores a tree model saved with its estimator, see load_tree_model
+ENGINES = ("auto", "compiled", "sklearn")
+# Largest batch the compiled walk scores faster than the sklearn estimator
+COMPILED_MAX_BATCH = 64
+ARRAYS = ["feature", "threshold", "left", "right", "missing_left", "value", "roots", "classes"]
+
+
+class CompiledForest:
+    """Flattened trees of a fitted ``DecisionTreeClassifier`` / ``RandomForestClassifier``."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, classes,
+                 average, estimator=None, max_batch=COMPILED_MAX_BATCH):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.average = average
+        self.estimator = estimator
+        self.max_batch = max_batch
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten ``model``, a fitted sklearn tree or forest classifier."""
+        trees = getattr(model, "estimators_", [model])
+        feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            tree = tree.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == TREE_LEAF
+
+            roots.append(offset)
+            # Leaves loop back to themselves; x <= inf keeps rows in place
+            feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            missing_left.append(np.asarray(getattr(tree, "missing_go_to_left",
+                                                   np.zeros(tree.node_count)), dtype=bool))
+
+            leaf_value = tree.value[:, 0, :model.n_classes_]
+            normalizer = leaf_value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(leaf_value / normalizer)
+            offset += tree.node_count
+
+        return cls(feature=np.concatenate(feature),
+                   threshold=np.concatenate(threshold),
+                   left=np.concatenate(left).astype(np.int32),
+                   right=np.concatenate(right).astype(np.int32),
+                   missing_left=np.concatenate(missing_left),
+                   value=np.concatenate(value),
+                   roots=np.array(roots, dtype=np.int32),
+                   classes=np.asarray(model.classes_),
+                   average=hasattr(model, "estimators_"))
+
+    def save(self, directory):
+        """Write the arrays as ``.npy`` files (plus ``meta.npy``) into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        np.save(os.path.join(directory, "meta.npy"), np.array([self.average]))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r", estimator=None, max_batch=COMPILED_MAX_BATCH):
+        """Load a forest saved with ``save``, memory-mapped by default.
+
+        ``estimator``, the sklearn model it was exported from, takes over
+        batches of more than ``max_batch`` rows.
+        """
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ARRAYS}
+        average, = np.load(os.path.join(directory, "meta.npy"))
+        return cls(average=bool(average), estimator=estimator, max_batch=max_batch, **arrays)
+
+    def apply(self, X):
+        """Return the leaf reached by every row in every tree, shape (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float32)
+        n_trees, n_rows = len(self.roots), len(X)
+        nodes = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows), n_trees)
+        has_missing = bool(self.missing_left.any())
+
+        active = np.arange(len(nodes))
+        while active.size:
+            current = nodes[active]
+            x = X[rows[active], self.feature[current]]
+            go_left = x <= self.threshold[current]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[self.left[current] != current]
+
+        return nodes.reshape(n_trees, n_rows)
+
+    def predict_proba(self, X, batch_size=4096):
+        """Return the class probabilities of ``X``, identical to sklearn's.
+
+        Batches of more than ``max_batch`` rows, and all batches of a single
+        tree, go to ``estimator`` when there is one; the compiled walk is
+        only faster on small batches of a forest.
+        """
+        if self.estimator is not None and (len(X) > self.max_batch or len(self.roots) == 1):
+            return self.estimator.predict_proba(np.asarray(X, dtype=np.float32))
+        proba = np.zeros((len(X), len(self.classes)))
+        for start in range(0, len(X), batch_size):
+            leaves = self.apply(X[start:start + batch_size])
+            batch = proba[start:start + batch_size]
+            # Add tree by tree, in estimator order, like sklearn
+            for tree_leaves in leaves:
+                batch += self.value[tree_leaves]
+
+        if self.average:
+            proba /= len(self.roots)
+        return proba
+
+    def predict(self, X, batch_size=4096):
+        return self.classes.take(self.predict_proba(X, batch_size).argmax(axis=1))
+
+
+def export_forest(model, directory):
+    """Flatten the fitted sklearn ``model`` and save it into ``directory``."""
+    forest = CompiledForest.from_sklearn(model)
+    forest.save(directory)
+    return forest
+
+
+def load_tree_model(directory, pickle_path, engine="auto"):
+    """Load the forest exported to ``directory`` as ``engine`` asks.
+
+    ``pickle_path`` is where the sklearn estimator was pickled, if it was
+    kept. ``engine`` is one of ``ENGINES``:
+
+    ``"auto"``
+        a ``CompiledForest`` holding the estimator, which scores batches
+        above ``COMPILED_MAX_BATCH`` rows;
+    ``"compiled"``
+        a ``CompiledForest`` alone, which keeps scikit-learn out of the
+        process;
+    ``"sklearn"``
+        the estimator alone.
+
+    Without the pickle every engine returns a ``CompiledForest`` alone.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+    estimator = None
+    if engine != "compiled" and os.path.exists(pickle_path):
+        with open(pickle_path, "rb") as f:
+            estimator = pickle.load(f)
+    if engine == "sklearn" and estimator is not None:
+        return estimator
+    return CompiledForest.load(directory, estimator=estimator)
@@ -0,0 +1,216 @@
+"""Imputation of the numeric NaNs left after cleaning.
+
+The notebook fits ``IterativeImputer(max_iter=10)`` on every row, which is
+the slowest preprocessing step and grows faster than the data. ``Imputer``
+keeps that as the default ``"iterative"`` mode and adds cheaper ones:
+
+``"median"``
+    Per-column median, or per-group median with ``group_by`` (a column or
+    a list of columns; falling back to the column median for groups that
+    have none).
+``"subsample"``
+    ``IterativeImputer`` fit on a stratified sample of ``n_samples`` rows,
+    then applied to every row.
+``"incremental"``
+    Like ``"subsample"`` on the first run; the fitted imputer is saved to
+    ``state_path`` and later runs (monthly refreshes) load it instead of
+    fitting again.
+
+In every mode only rows with a NaN in ``columns`` go through ``transform``;
+complete rows are copied as they are. ``benchmarks/bench_impute.py`` reports
+the time and accuracy of each mode against the notebook's full fit.
+
+A fitted ``IterativeImputer`` is only a mean fill followed by a fixed
+chain of linear predictions (its default ``BayesianRidge`` estimators).
+``Imputer.compiled`` replays that chain with NumPy (``LinearChainImputer``),
+so a pickled, compiled imputer loads without importing scikit-learn.
+"""
+import copy
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+MODES = ("iterative", "median", "subsample", "incremental")
+# Rows filled at a time when ``transform`` writes into a given array
+BLOCK_ROWS = 65_536
+
+
+def stratified_sample(frame, n_samples, stratify=None, random_state=0):
+    """Return about ``n_samples`` rows of ``frame``, keeping the ``stratify`` mix."""
+    if n_samples >= len(frame):
+        return frame
+    if stratify is None:
+        return frame.sample(n_samples, random_state=random_state)
+
+    return (frame.groupby(stratify, observed=True, group_keys=False)
+            .sample(frac=n_samples / len(frame), random_state=random_state))
+
+
+class LinearChainImputer:
+    """NumPy replay of a fitted ``IterativeImputer`` with linear estimators.
+
+    Missing values start at ``statistics`` (the initial column means); then,
+    step by step, each target column's missing entries are set to
+    ``values[:, neighbors] @ coef + intercept``, clipped to the column's
+    ``min_value`` / ``max_value``.
+    """
+
+    def __init__(self, statistics, steps, min_value, max_value):
+        self.statistics = statistics
+        # (target column, neighbor columns, coef, intercept) per step
+        self.steps = steps
+        self.min_value = min_value
+        self.max_value = max_value
+
+    @classmethod
+    def from_sklearn(cls, imputer):
+        """Return the chain of a fitted ``IterativeImputer``, or None if it is not linear."""
+        statistics = imputer.initial_imputer_.statistics_
+        if (imputer.sample_posterior or imputer.add_indicator
+                or np.isnan(statistics).any()):
+            return None
+        steps = []
+        for step in imputer.imputation_sequence_:
+            estimator = step.estimator
+            if type(estimator).__name__ != "BayesianRidge":
+                return None
+            steps.append((step.feat_idx, np.asarray(step.neighbor_feat_idx),
+                          np.asarray(estimator.coef_, dtype="float64"),
+                          float(estimator.intercept_)))
+        return cls(statistics.astype("float64"), steps,
+                   np.asarray(imputer._min_value, dtype="float64"),
+                   np.asarray(imputer._max_value, dtype="float64"))
+
+    def transform(self, values):
+        missing = np.isnan(values)
+        filled = np.where(missing, self.statistics, values)
+        for target, neighbors, coef, intercept in self.steps:
+            rows = missing[:, target]
+            if rows.any():
+                predicted = filled[rows][:, neighbors] @ coef + intercept
+                filled[rows, target] = np.clip(predicted, self.min_value[target],
+                                               self.max_value[target])
+        return filled
+
+
+class Imputer:
+    """Fill the NaNs of ``columns`` using one of ``MODES``."""
+
+    def __init__(self, columns, mode="iterative", group_by=None, n_samples=50_000,
+                 stratify=None, state_path=None, max_iter=10, random_state=0):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        if mode == "incremental" and state_path is None:
+            raise ValueError("mode='incremental' needs a state_path")
+
+        self.columns = list(columns)
+        self.mode = mode
+        self.group_by = group_by
+        self.n_samples = n_samples
+        self.stratify = stratify
+        self.state_path = state_path
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def _iterative(self):
+        from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+        from sklearn.impute import IterativeImputer
+
+        return IterativeImputer(max_iter=self.max_iter, random_state=self.random_state)
+
+    def fit(self, frame):
+        """Fit on ``frame``, which must hold ``columns`` (and ``group_by`` / ``stratify``)."""
+        if self.mode == "incremental" and os.path.exists(self.state_path):
+            with open(self.state_path, "rb") as f:
+                self.imputer_ = pickle.load(f)
+            return self
+
+        if self.mode == "median":
+            self.medians_ = frame[self.columns].median()
+            if self.group_by is not None:
+                self.group_medians_ = (frame.groupby(self.group_by, observed=True)[self.columns]
+                                       .median().fillna(self.medians_))
+            return self
+
+        if self.mode != "iterative":
+            frame = stratified_sample(frame, self.n_samples, self.stratify, self.random_state)
+
+        self.imputer_ = self._iterative().fit(frame[self.columns].to_numpy(dtype="float64"))
+        if self.mode == "incremental":
+            with open(self.state_path, "wb") as f:
+                pickle.dump(self.imputer_, f)
+
+        return self
+
+    def _fill_median(self, groups, values):
+        if groups is None:
+            fill = np.broadcast_to(self.medians_.to_numpy(), values.shape)
+        else:
+            if isinstance(groups, pd.DataFrame):
+                # A list of group_by columns: one key tuple per row
+                groups = (groups.iloc[:, 0] if groups.shape[1] == 1
+                          else pd.MultiIndex.from_frame(groups))
+            rows = self.group_medians_.index.get_indexer(groups)
+            # Groups unseen during fit (index -1) pick the column medians
+            # appended as the last row
+            table = np.vstack([self.group_medians_.to_numpy(), self.medians_.to_numpy()])
+            fill = table[rows]
+
+        return np.where(np.isnan(values), fill, values)
+
+    def _fill(self, frame, values, rows):
+        """Fill the NaNs of ``values``, which hold ``frame[columns]`` at ``rows``."""
+        incomplete = np.isnan(values).any(axis=1)
+        if incomplete.any():
+            if self.mode == "median":
+                groups = None
+                if self.group_by is not None:
+                    groups = frame[self.group_by].iloc[rows][incomplete]
+                values[incomplete] = self._fill_median(groups, values[incomplete])
+            else:
+                values[incomplete] = self.imputer_.transform(values[incomplete])
+        return values
+
+    def transform(self, frame, out=None, out_columns=None, block_rows=BLOCK_ROWS):
+        """Return ``frame[columns]`` as a float64 frame with the NaNs filled.
+
+        With ``out``, the filled values are written into the columns
+        ``out_columns`` of that array instead (by default its first
+        ``len(columns)``), ``block_rows`` rows at a time, and ``out`` is
+        returned: only one block is ever held as float64.
+        """
+        if out is None:
+            values = frame[self.columns].to_numpy(dtype="float64", copy=True)
+            values = self._fill(frame, values, slice(None))
+            return pd.DataFrame(values, columns=self.columns, index=frame.index)
+
+        if out_columns is None:
+            out_columns = slice(0, len(self.columns))
+        sources = [frame[column].to_numpy() for column in self.columns]
+        for start in range(0, len(frame), block_rows):
+            rows = slice(start, start + block_rows)
+            values = np.column_stack([source[rows] for source in sources]).astype("float64")
+            out[rows, out_columns] = self._fill(frame, values, rows)
+        return out
+
+    def fit_transform(self, frame):
+        return self.fit(frame).transform(frame)
+
+    def compiled(self):
+        """Return a copy whose fitted ``IterativeImputer`` is a ``LinearChainImputer``.
+
+        The copy imputes the same values but no longer needs scikit-learn;
+        imputers that cannot be compiled (median mode, non-linear
+        estimators) are returned as they are.
+        """
+        imputer = getattr(self, "imputer_", None)
+        if imputer is None or isinstance(imputer, LinearChainImputer):
+            return self
+        chain = LinearChainImputer.from_sklearn(imputer)
+        if chain is None:
+            return self
+        compiled = copy.copy(self)
+        compiled.imputer_ = chain
+        return compiled
@@ -0,0 +1,227 @@
+"""Parallel training and comparison of the notebook's classifiers.
+
+The notebook fits GaussianNB, KNN, a decision tree and a random forest one
+after another on one core. ``compare_models`` fits them concurrently, one
+process per model, and collects one table of metrics, fit time and predict
+time. The train/validation arrays are written once as ``.npy`` files and
+memory-mapped by every worker instead of being pickled to each of them.
+
+The features may also be a SciPy CSR matrix (``--sparse``, built by
+``FeaturePipeline.transform_sparse``), which is what gets shared. Models
+whose sklearn tags accept sparse input (KNN and the trees) train on it
+directly if at most ``SPARSE_MAX_DENSITY`` of its entries are stored;
+the others (GaussianNB), and every model on a denser matrix, share one
+dense copy, written block by block by the parent and memory-mapped like
+the dense features. sklearn's sparse tree and neighbour code pays off
+only on really sparse data: with the notebook's mostly numeric columns it
+fits several times slower (``benchmarks/bench_sparse.py``), so on this
+data every model trains dense.
+
+Usage::
+
+    python -m credit_risk.models loan_data_2007_2014.csv
+    python -m credit_risk.models loan_data_2007_2014.csv --sparse
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, precision_recall_fscore_support, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.utils import get_tags
+
+from credit_risk.cache import load_features
+from credit_risk.pipeline import build_from_csv, risk_target
+
+# Arrays that make up a CSR matrix, saved as one ``.npy`` file each
+CSR_PARTS = ("data", "indices", "indptr", "shape")
+# Densest CSR matrix that sparse-capable models still train on directly. On
+# the real features (density 0.43, 0.20 with "addr_state" one-hot) the
+# decision tree fits 5.9x / 5.4x slower on CSR (benchmarks/bench_sparse.py),
+# so both stay dense; only much wider one-hot encodings get through.
+SPARSE_MAX_DENSITY = 0.1
+# Rows densified at a time when a CSR matrix is shared densely
+DENSE_BLOCK_ROWS = 50_000
+
+
+def default_models():
+    """Return the notebook's four classifiers, keyed by their notebook names."""
+    return {
+        "gnb": GaussianNB(),
+        "knn": KNeighborsClassifier(),
+        "dtree": DecisionTreeClassifier(random_state=10),
+        "rfc": RandomForestClassifier(random_state=10),
+    }
+
+
+def accepts_sparse(model):
+    """Return whether ``model`` can be fitted on a SciPy sparse matrix."""
+    try:
+        return get_tags(model).input_tags.sparse
+    except (AttributeError, TypeError):
+        return False
+
+
+def density(X):
+    """Return the share of the entries of the sparse matrix ``X`` that are stored."""
+    return X.nnz / max(1, X.shape[0] * X.shape[1])
+
+
+def trains_sparse(model, X, max_density=SPARSE_MAX_DENSITY):
+    """Return whether ``model`` should be fitted on the sparse ``X`` as it is."""
+    return accepts_sparse(model) and density(X) <= max_density
+
+
+def share_arrays(directory, dense=False, **arrays):
+    """Save ``arrays`` as ``.npy`` files in ``directory``, return their paths.
+
+    A sparse matrix is saved as CSR, one file per part, or with ``dense``
+    as a dense array, ``DENSE_BLOCK_ROWS`` rows at a time.
+    """
+    paths = {}
+    for name, array in arrays.items():
+        if sparse.issparse(array) and dense:
+            array = sparse.csr_matrix(array)
+            paths[name] = os.path.join(directory, f"{name}.npy")
+            out = np.lib.format.open_memmap(paths[name], mode="w+", dtype=array.dtype,
+                                            shape=array.shape)
+            for start in range(0, array.shape[0], DENSE_BLOCK_ROWS):
+                block = slice(start, start + DENSE_BLOCK_ROWS)
+                out[block] = array[block].toarray()
+            out.flush()
+            del out
+        elif sparse.issparse(array):
+            array = sparse.csr_matrix(array)
+            paths[name] = {}
+            for part in CSR_PARTS:
+                paths[name][part] = os.path.join(directory, f"{name}.{part}.npy")
+                np.save(paths[name][part], np.asarray(getattr(array, part)))
+        else:
+            paths[name] = os.path.join(directory, f"{name}.npy")
+            np.save(paths[name], np.asarray(array))
+
+    return paths
+
+
+def load_shared(paths):
+    """Memory-map arrays saved with ``share_arrays``, read-only."""
+    arrays = {}
+    for name, path in paths.items():
+        if isinstance(path, dict):
+            parts = {part: np.load(path[part], mmap_mode="r") for part in CSR_PARTS}
+            arrays[name] = sparse.csr_matrix((parts["data"], parts["indices"], parts["indptr"]),
+                                             shape=tuple(parts["shape"]), copy=False)
+        else:
+            arrays[name] = np.load(path, mmap_mode="r")
+    return arrays
+
+
+def evaluate(model, val_X, val_y):
+    """Return the validation metrics of a fitted ``model`` (class 1 is "risky")."""
+    start = time.perf_counter()
+    predict_y = model.predict(val_X)
+    predict_s = time.perf_counter() - start
+
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        val_y, predict_y, average="binary", zero_division=0
+    )
+    metrics = {"accuracy": accuracy_score(val_y, predict_y),
+               "precision": precision, "recall": recall, "f1": f1,
+               "predict_s": predict_s}
+    if hasattr(model, "predict_proba"):
+        metrics["roc_auc"] = roc_auc_score(val_y, model.predict_proba(val_X)[:, 1])
+
+    return metrics
+
+
+def _fit_and_evaluate(name, model, paths, return_model):
+    data = load_shared(paths)
+    train_X, val_X = data["train_X"], data["val_X"]
+    sparse_input = sparse.issparse(train_X)
+
+    start = time.perf_counter()
+    model.fit(train_X, data["train_y"])
+    fit_s = time.perf_counter() - start
+
+    metrics = {"model": name, "input": "sparse" if sparse_input else "dense", "fit_s": fit_s}
+    metrics.update(evaluate(model, val_X, data["val_y"]))
+    return metrics, model if return_model else None
+
+
+def compare_models(train_X, train_y, val_X, val_y, models=None, max_workers=None,
+                   n_jobs=None, return_models=False):
+    """Fit ``models`` (``default_models()`` if None) in parallel and compare them.
+
+    Each model gets its own process; estimators with an ``n_jobs`` parameter
+    also get ``n_jobs`` threads (by default the cores left per model).
+    Returns the comparison table, and a dict of fitted models as well with
+    ``return_models=True``.
+    """
+    if models is None:
+        models = default_models()
+    if max_workers is None:
+        max_workers = min(len(models), os.cpu_count())
+    if n_jobs is None:
+        n_jobs = max(1, os.cpu_count() // len(models))
+
+    for model in models.values():
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=n_jobs)
+
+    # Only models that train on the CSR matrix get it; the rest share a dense copy
+    sparse_models = {name for name, model in models.items()
+                     if sparse.issparse(train_X) and trains_sparse(model, train_X)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = share_arrays(directory, train_y=train_y, val_y=val_y)
+        features = {}
+        if sparse_models:
+            features[True] = share_arrays(directory, train_X=train_X, val_X=val_X)
+        if len(sparse_models) < len(models):
+            features[False] = share_arrays(directory, dense=True, train_X=train_X, val_X=val_X)
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(_fit_and_evaluate, name, model,
+                                       {**paths, **features[name in sparse_models]},
+                                       return_models)
+                       for name, model in models.items()]
+            results = [future.result() for future in futures]
+
+    table = pd.DataFrame([metrics for metrics, _ in results]).set_index("model")
+    if return_models:
+        return table, {name: model for (_, model), name in zip(results, models)}
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the notebook's classifiers.")
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--max-workers", type=int)
+    parser.add_argument("--n-jobs", type=int)
+    parser.add_argument("--sparse", action="store_true",
+                        help="train on a CSR feature matrix (built without the cache)")
+    args = parser.parse_args(argv)
+
+    if args.sparse:
+        X, loan_risk_est = build_from_csv(args.path, sparse=True)
+    else:
+        final_loan_data, loan_risk_est = load_features(args.path)
+        X = final_loan_data.to_numpy()
+    y = risk_target(loan_risk_est)
+    train_X, val_X, train_y, val_y = train_test_split(X, y, random_state=0)
+
+    table = compare_models(train_X, train_y, val_X, val_y,
+                           max_workers=args.max_workers, n_jobs=args.n_jobs)
+    print(table.to_string(float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Fitted steps of the notebook that turn cleaned loans into ``final_loan_data``.
+
+``FeaturePipeline`` picks up where ``credit_risk.transforms.clean_chunk``
+stops: the ordinal codes of "grade" and "addr_state", the dummies, the
+imputation of the numeric NaNs, producing the same columns in the same
+order as the notebook. Instead of the notebook's chain of ``drop`` and
+``pd.concat`` calls, each step writes its columns straight into one
+preallocated float32 matrix. Fitted once, it replays the same encoding on
+new data.
+"""
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.encoding import CategoricalEncoder
+from credit_risk.impute import Imputer
+from credit_risk.loader import load_loan_data
+from credit_risk.profiling import run_stage
+from credit_risk.schema import AMBIGUOUS, EMP_LENGTH, GOOD_LOAN, SCHEMA
+from credit_risk.transforms import clean_chunk
+
+ORDINAL_FIELDS = ["grade", "addr_state"]
+DUMMY_FIELDS = ["home_ownership", "verification_status", "purpose"]
+NUM_COLS = ["loan_amnt", "int_rate", "installment", "emp_length",
+            "annual_inc", "dti", "delinq_2yrs", "earliest_cr_line",
+            "inq_last_6mths", "open_acc", "pub_rec", "revol_bal",
+            "revol_util", "total_acc", "collections_12_mths_ex_med",
+            "acc_now_delinq", "major_derogatory", "yr_since_last_inq"]
+
+NAN_COLS = ["annual_inc", "delinq_2yrs", "earliest_cr_line",
+            "inq_last_6mths", "open_acc", "pub_rec", "revol_util",
+            "total_acc", "collections_12_mths_ex_med",
+            "acc_now_delinq", "yr_since_last_inq"]
+
+IMPUTER_PARAMS = {"mode": "iterative", "max_iter": 10, "random_state": 0}
+
+
+def pipeline_config():
+    """Return every setting that changes ``final_loan_data``, as plain data."""
+    return {
+        "schema": SCHEMA,
+        "ambiguous": AMBIGUOUS,
+        "good_loan": GOOD_LOAN,
+        "emp_length": EMP_LENGTH,
+        "ordinal_fields": ORDINAL_FIELDS,
+        "dummy_fields": DUMMY_FIELDS,
+        "num_cols": NUM_COLS,
+        "nan_cols": NAN_COLS,
+        "imputer": IMPUTER_PARAMS,
+    }
+
+
+def _span(slices, fields):
+    """Return the slice covering the consecutive ``fields`` of ``column_slices_``."""
+    if not fields:
+        return slice(0, 0)
+    return slice(slices[fields[0]].start, slices[fields[-1]].stop)
+
+
+def _to_csr(dense, positions, onehot, n_columns):
+    """Return the CSR matrix of ``dense`` with the dummies of ``positions`` inserted.
+
+    ``dense`` holds every column but the dummies, in order; ``positions``
+    holds each row's dummy per one-hot field, counted from ``onehot.start``
+    (-1 for none). Zeros of ``dense`` are not stored.
+    """
+    from scipy import sparse
+
+    split = onehot.start
+    n_rows = len(dense)
+    values = np.hstack([dense[:, :split], np.ones(positions.shape, dtype=dense.dtype),
+                        dense[:, split:]])
+    columns = np.hstack([np.broadcast_to(np.arange(split, dtype=np.int32), (n_rows, split)),
+                         np.where(positions >= 0, positions + split, -1).astype(np.int32),
+                         np.broadcast_to(np.arange(onehot.stop, n_columns, dtype=np.int32),
+                                         (n_rows, n_columns - onehot.stop))])
+    # Row-major order keeps the columns of each row sorted, as CSR expects
+    kept = (values != 0) & (columns >= 0)
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(kept.sum(axis=1), out=indptr[1:])
+    return sparse.csr_matrix((values[kept], columns[kept], indptr), shape=(n_rows, n_columns))
+
+
+class FeaturePipeline:
+    """The fitted encoder and imputer that turn cleaned loans into features.
+
+    ``fit`` learns them from a cleaned training frame; ``transform`` replays
+    them on any frame that went through ``clean_features``, including
+    application records at scoring time.
+    """
+
+    def __init__(self, encoder=None, imputer=None):
+        self.encoder = encoder
+        self.imputer = imputer
+
+    def fit(self, frame, profiler=None):
+        """Fit the encoder and imputer not given at construction on ``frame``."""
+        self.encoder_ = self.encoder
+        if self.encoder_ is None:
+            self.encoder_ = run_stage(profiler, "fit_encoder",
+                                      CategoricalEncoder(ORDINAL_FIELDS, DUMMY_FIELDS).fit, frame)
+
+        self.imputer_ = self.imputer
+        if self.imputer_ is None:
+            self.imputer_ = run_stage(profiler, "fit_imputer",
+                                      Imputer(NAN_COLS, **IMPUTER_PARAMS).fit, frame)
+        return self
+
+    @property
+    def columns_(self):
+        """Columns of ``final_loan_data``, in the notebook's order.
+
+        That is term, grade, addr_state, initial_list_status, the dummies,
+        then the numeric columns.
+        """
+        encoder = self.encoder_
+        return (["term"] + encoder.ordinal_names_ + ["initial_list_status"]
+                + encoder.onehot_names_ + NUM_COLS)
+
+    @property
+    def column_slices_(self):
+        """Slice of ``final_loan_data`` holding each field, keyed by field name.
+
+        One-hot fields map to the slice of all their dummies, every other
+        field to a single column.
+        """
+        encoder = self.encoder_
+        widths = ([("term", 1)] + [(field, 1) for field in encoder.ordinal]
+                  + [("initial_list_status", 1)]
+                  + [(field, len(encoder.vocabularies_[field])) for field in encoder.onehot]
+                  + [(column, 1) for column in NUM_COLS])
+        slices = {}
+        start = 0
+        for field, width in widths:
+            slices[field] = slice(start, start + width)
+            start += width
+        return slices
+
+    def transform_matrix(self, frame, out=None, profiler=None):
+        """Return ``final_loan_data`` of the cleaned ``frame`` as one float32 array.
+
+        The array is allocated once and every block is written straight
+        into its columns (``column_slices_``), so no intermediate frames
+        are built or concatenated. A given ``out`` must be zero-filled.
+        """
+        if out is None:
+            out = np.zeros((len(frame), len(self.columns_)), dtype="float32")
+        slices = self.column_slices_
+        run_stage(profiler, "encode", self._encode, frame, out, slices)
+        run_stage(profiler, "impute", self._impute, frame, out, slices)
+        return out
+
+    def transform(self, frame, profiler=None):
+        """Return ``final_loan_data`` for the cleaned ``frame``, backed by one float32 array."""
+        return pd.DataFrame(self.transform_matrix(frame, profiler=profiler),
+                            columns=self.columns_, index=frame.index, copy=False)
+
+    def transform_sparse(self, frame, profiler=None):
+        """Return ``final_loan_data`` of the cleaned ``frame`` as a float32 CSR matrix.
+
+        Same columns as ``transform_matrix``, but only nonzero values are
+        stored: each one-hot field costs one entry per row however many
+        dummies it has, and the mostly-zero counts (delinq_2yrs, pub_rec,
+        ...) shrink too. The dummies are never expanded: the encoder's
+        column positions go straight into the CSR indices.
+        """
+        slices = self.column_slices_
+        onehot = _span(slices, self.encoder_.onehot)
+        # Every other field packed into one dense block, in column order
+        dense_fields = [field for field in slices if field not in self.encoder_.onehot]
+        packed = {field: slice(j, j + 1) for j, field in enumerate(dense_fields)}
+
+        dense = np.zeros((len(frame), len(dense_fields)), dtype="float32")
+        positions = run_stage(profiler, "encode", self._encode_sparse, frame, dense, packed)
+        run_stage(profiler, "impute", self._impute, frame, dense, packed)
+        return run_stage(profiler, "to_csr", _to_csr, dense, positions, onehot,
+                         len(self.columns_))
+
+    def _encode_codes(self, frame, out, slices):
+        """Write term, the ordinal codes and initial_list_status."""
+        out[:, slices["term"].start] = frame["term"].to_numpy()
+        self.encoder_.transform_ordinal(frame, out[:, _span(slices, self.encoder_.ordinal)])
+        out[:, slices["initial_list_status"].start] = frame["initial_list_status"].to_numpy()
+
+    def _encode(self, frame, out, slices):
+        self._encode_codes(frame, out, slices)
+        self.encoder_.transform_onehot(frame, out[:, _span(slices, self.encoder_.onehot)])
+        return out
+
+    def _encode_sparse(self, frame, dense, packed):
+        self._encode_codes(frame, dense, packed)
+        return self.encoder_.onehot_positions(frame)
+
+    def _impute(self, frame, out, slices):
+        imputed = self.imputer_.columns
+        for column in NUM_COLS:
+            if column not in imputed:
+                out[:, slices[column].start] = frame[column].to_numpy()
+        return self.imputer_.transform(frame, out=out,
+                                       out_columns=[slices[column].start for column in imputed])
+
+    def fit_transform(self, frame, profiler=None):
+        return self.fit(frame, profiler).transform(frame, profiler)
+
+    def save(self, directory):
+        """Write the fitted encoder (JSON) and imputer (pickle) into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "encoder.json"), "w") as f:
+            json.dump(self.encoder_.to_dict(), f)
+        with open(os.path.join(directory, "imputer.pkl"), "wb") as f:
+            # Compiled, so loading it does not import scikit-learn
+            pickle.dump(self.imputer_.compiled(), f)
+
+    @classmethod
+    def load(cls, directory):
+        """Load a pipeline saved with ``save``."""
+        with open(os.path.join(directory, "encoder.json")) as f:
+            encoder = CategoricalEncoder.from_dict(json.load(f))
+        with open(os.path.join(directory, "imputer.pkl"), "rb") as f:
+            imputer = pickle.load(f)
+        pipeline = cls(encoder, imputer)
+        pipeline.encoder_, pipeline.imputer_ = encoder, imputer
+        return pipeline
+
+
+def build_features(frame, encoder=None, imputer=None, profiler=None, sparse=False):
+    """Return ``(final_loan_data, loan_risk_est)`` for a cleaned frame.
+
+    ``encoder`` and ``imputer`` are fitted on ``frame`` unless fitted ones
+    are given; ``imputer`` defaults to ``Imputer(NAN_COLS, **IMPUTER_PARAMS)``.
+    With ``sparse=True``, ``final_loan_data`` is a CSR matrix
+    (``FeaturePipeline.transform_sparse``) instead of a DataFrame.
+    """
+    pipeline = FeaturePipeline(encoder, imputer).fit(frame, profiler)
+    if sparse:
+        final_loan_data = pipeline.transform_sparse(frame, profiler)
+    else:
+        final_loan_data = pipeline.transform(frame, profiler)
+    return final_loan_data, frame["loan_risk_est"]
+
+
+def build_from_csv(path, profiler=None, sparse=False):
+    """Load, clean and featurize the extract at ``path`` in memory.
+
+    With a ``credit_risk.profiling.Profiler``, every step is recorded as a stage.
+    """
+    frame = run_stage(profiler, "load", load_loan_data, path)
+    return build_features(clean_chunk(frame, profiler), profiler=profiler, sparse=sparse)
+
+
+def risk_target(loan_risk_est):
+    """Encode "loan_risk_est" as the model target: 1 for risky, 0 for good."""
+    return np.where(loan_risk_est == "risky", 1, 0)
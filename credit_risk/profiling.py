@@ -0,0 +1,219 @@
+"""Per-stage instrumentation of the preprocessing pipeline.
+
+Every cleaning step and every part of ``FeaturePipeline`` runs as a named
+stage through ``run_stage``. Without a ``Profiler`` that is a plain call;
+with one, each stage records its wall time, the shape of its input and
+output, the RSS change, the process's peak RSS so far and which output
+columns no longer share memory
+with the input (the copies a stage made), optionally with a tracemalloc
+peak and a cProfile summary. Records export as JSON or as a Chrome trace
+(chrome://tracing, Perfetto), where nested stages show up nested.
+
+Usage::
+
+    python -m credit_risk.profiling loan_data_2007_2014.csv --trace trace.json
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+# Functions listed per stage in the cProfile summary
+PROFILE_LINES = 15
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def _shape(value):
+    shape = getattr(value, "shape", None)
+    if shape is None:
+        return None
+    return [int(n) for n in shape]
+
+
+def _buffers(frame):
+    """Return ``{column: ndarray}`` of the memory behind each column of ``frame``.
+
+    A list of frames (the input of ``pd.concat``) gives the columns of all.
+    """
+    if isinstance(frame, (list, tuple)):
+        return {column: values for part in frame for column, values in _buffers(part).items()}
+    if not isinstance(frame, pd.DataFrame):
+        return {}
+    buffers = {}
+    for column in frame.columns.unique():
+        values = frame[column]
+        if isinstance(values, pd.DataFrame):
+            continue
+        values = values.array
+        if isinstance(values, pd.Categorical):
+            values = values.codes
+        try:
+            buffers[column] = np.asarray(values)
+        except (TypeError, ValueError):
+            continue
+    return buffers
+
+
+def copied_columns(before, after):
+    """Return the columns of ``after`` that hold a copy of the same column of ``before``."""
+    before = _buffers(before)
+    return [column for column, values in _buffers(after).items()
+            if column in before and not np.shares_memory(values, before[column])]
+
+
+class Profiler:
+    """Collect one record per stage run through ``run_stage``.
+
+    ``trace_memory`` adds the tracemalloc peak of each stage and ``profile``
+    a cProfile summary; both slow the stages down, so they are off by
+    default.
+    """
+
+    def __init__(self, trace_memory=False, profile=False):
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.records = []
+        self._depth = 0
+        # Absolute tracemalloc peak seen so far in each open stage
+        self._peaks = []
+        self._origin = time.perf_counter()
+
+    def run(self, name, func, *args, **kwargs):
+        """Call ``func(*args, **kwargs)`` as stage ``name`` and record it."""
+        data = args[0] if args else None
+        record = {"stage": name, "depth": self._depth, "input_shape": _shape(data)}
+        self.records.append(record)
+
+        if self.trace_memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            if self._peaks:
+                # Keep the enclosing stage's peak before resetting it
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+            traced_before = tracemalloc.get_traced_memory()[0]
+        profiler = None
+        if self.profile and self._depth == 0:
+            import cProfile
+
+            profiler = cProfile.Profile()
+        rss_before = _rss_bytes()
+
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                result = profiler.runcall(func, *args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            self._depth -= 1
+
+        record["start_s"] = start - self._origin
+        record["seconds"] = end - start
+        record["output_shape"] = _shape(result)
+        rss_after = _rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            record["rss_delta_mb"] = (rss_after - rss_before) / 2**20
+        if resource is not None:
+            record["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        copies = copied_columns(data, result)
+        record["copied_columns"] = len(copies)
+        record["copied_mb"] = sum(result[column].memory_usage(index=False, deep=False)
+                                  for column in copies) / 2**20
+        if self.trace_memory:
+            peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            record["traced_peak_mb"] = (peak - traced_before) / 2**20
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            if started_tracing:
+                tracemalloc.stop()
+        if profiler is not None:
+            import io
+            import pstats
+
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            record["profile"] = out.getvalue()
+        return result
+
+    def to_frame(self):
+        """Return the records as a DataFrame, one row per stage run."""
+        frame = pd.DataFrame(self.records)
+        return frame.drop(columns="profile", errors="ignore")
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.records, f, indent=2)
+
+    def to_chrome_trace(self, path):
+        """Write the records in the Chrome trace event format."""
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            args = {key: value for key, value in record.items()
+                    if key not in ("stage", "start_s", "seconds", "depth", "profile")}
+            events.append({"name": record["stage"], "cat": "stage", "ph": "X",
+                           "ts": record["start_s"] * 1e6, "dur": record["seconds"] * 1e6,
+                           "pid": pid, "tid": 0, "args": args})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def run_stage(profiler, name, func, *args, **kwargs):
+    """Call ``func`` as stage ``name`` of ``profiler``, or directly without one."""
+    if profiler is None:
+        return func(*args, **kwargs)
+    return profiler.run(name, func, *args, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the preprocessing stage by stage.")
+    parser.add_argument("path")
+    parser.add_argument("--trace", help="write a Chrome trace to this file")
+    parser.add_argument("--json", help="write the stage records to this file")
+    parser.add_argument("--trace-memory", action="store_true", help="record tracemalloc peaks")
+    parser.add_argument("--profile", action="store_true",
+                        help="print a cProfile summary of each top-level stage")
+    args = parser.parse_args(argv)
+
+    from credit_risk.pipeline import build_from_csv
+
+    profiler = Profiler(trace_memory=args.trace_memory, profile=args.profile)
+    build_from_csv(args.path, profiler=profiler)
+
+    table = profiler.to_frame()
+    table["stage"] = ["  " * depth + stage for depth, stage in zip(table["depth"], table["stage"])]
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.drop(columns=["depth", "start_s"]).to_string(index=False, float_format="%.3f"))
+    if args.profile:
+        for record in profiler.records:
+            if "profile" in record:
+                print(f"\n== {record['stage']} ==\n{record['profile']}")
+    if args.json:
+        profiler.to_json(args.json)
+    if args.trace:
+        profiler.to_chrome_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Column groups and dtypes of the LendingClub loan extract.
+
+The column groups are the ones declared in ``Analysis.py``; ``SCHEMA`` lists
+only the source columns that survive the notebook's cleaning steps (plus the
+ones its derived features are computed from), each with the most compact
+dtype that still holds its values.
+"""
+
+# Column groups, as grouped in the "Column Understanding" section
+LOAN_CHARS = ["id",
+              "loan_amnt",
+              "funded_amnt", "funded_amnt_inv",
+              "term",
+              "int_rate",
+              "installment",
+              "grade", "sub_grade",
+              "application_type"]
+
+BORROWERS = ["member_id",
+             "emp_title", "emp_length",
+             "home_ownership",
+             "annual_inc",
+             "verification_status",
+             "zip_code", "addr_state",
+             "dti"]
+
+BORROWER_TRS = ["delinq_2yrs",
+                "earliest_cr_line",
+                "inq_last_6mths",
+                "mths_since_last_delinq", "mths_since_last_record",
+                "open_acc",
+                "pub_rec",
+                "revol_bal", "revol_util",
+                "total_acc",
+                "initial_list_status",
+                "mths_since_last_major_derog",
+                "acc_now_delinq"]
+
+LOAN_STATS = ["issue_d",
+              "loan_status",
+              "pymnt_plan",
+              "out_prncp", "out_prncp_inv",
+              "total_pymnt", "total_pymnt_inv",
+              "total_rec_prncp", "total_rec_int", "total_rec_late_fee",
+              "recoveries",
+              "collection_recovery_fee",
+              "last_pymnt_d", "last_pymnt_amnt",
+              "next_pymnt_d"]
+
+# Columns dropped by the notebook's cleaning steps
+UNUSED_COLS = ["Unnamed: 0", "id", "member_id", "url", "desc", "zip_code", "title", "emp_title"]
+DUPLICATE_COLS = ["funded_amnt", "funded_amnt_inv"]
+SPARSE_COLS = ["mths_since_last_delinq", "mths_since_last_record"]
+PIVOT_COLS = ["tot_coll_amt", "tot_cur_bal", "total_rev_hi_lim"]
+UNIFORM_COLS = ["policy_code", "application_type"]
+
+# "loan_status" values used to label the target
+AMBIGUOUS = ["Current", "In Grace Period"]
+GOOD_LOAN = ["Fully Paid", "Does not meet the credit policy. Status:Fully Paid"]
+
+# Ordinal order of "emp_length", kept exactly as written in the notebook
+# ("1 year" is spelled "1 years" there, so it falls through to 0 like NaN)
+EMP_LENGTH = ["< 1 year", "1 years", "2 years", "3 years", "4 years",
+              "5 years", "6 years", "7 years", "8 years", "9 years", "10+ years"]
+
+# Source columns read by the pipeline. float32 keeps these columns to the
+# precision they are recorded with (whole-dollar amounts below 2**24, rates
+# and installments with two decimals); annual_inc has cents on values in the
+# millions, so it stays float64. Count columns keep a float dtype because they
+# contain NaN until imputation.
+SCHEMA = {
+    # Loan characteristics
+    "loan_amnt": "float32",
+    "term": "category",
+    "int_rate": "float32",
+    "installment": "float32",
+    "grade": "category",
+    # Borrower
+    "emp_length": "category",
+    "home_ownership": "category",
+    "annual_inc": "float64",
+    "verification_status": "category",
+    "purpose": "category",
+    "addr_state": "category",
+    "dti": "float32",
+    # Borrower's records
+    "delinq_2yrs": "float32",
+    "earliest_cr_line": "category",
+    "inq_last_6mths": "float32",
+    "open_acc": "float32",
+    "pub_rec": "float32",
+    "revol_bal": "float32",
+    "revol_util": "float32",
+    "total_acc": "float32",
+    "initial_list_status": "category",
+    "mths_since_last_major_derog": "float32",
+    "acc_now_delinq": "float32",
+    "last_credit_pull_d": "category",
+    "collections_12_mths_ex_med": "float32",
+    # Target
+    "loan_status": "category",
+}
+
+# Columns only looked at by the exploratory part of the notebook
+EDA_SCHEMA = {
+    "sub_grade": "category",
+    "mths_since_last_delinq": "float32",
+    "mths_since_last_record": "float32",
+    "tot_coll_amt": "float32",
+    "tot_cur_bal": "float32",
+    "total_rev_hi_lim": "float32",
+    "policy_code": "float32",
+    "application_type": "category",
+}
+
+# Binary flags derived during cleaning
+FLAG_DTYPE = "int8"
+FLAG_COLS = ["major_derogatory", "initial_list_status"]
+
+
+def usecols(schema=None):
+    """Return the source columns to read for ``schema``."""
+    if schema is None:
+        schema = SCHEMA
+
+    return list(schema)
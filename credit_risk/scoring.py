@@ -0,0 +1,151 @@
+"""Scoring of loan applications with saved model artifacts.
+
+``RiskScorer`` takes raw application records, keyed by the original CSV
+column names, replays the fitted preprocessing (emp_length map, ordinal
+codes, dummies, date features, imputer) and returns the probability that
+each loan is risky. This is all a scoring worker imports: NumPy, pandas
+and the preprocessing modules. scikit-learn is only needed to train
+(``train_artifacts``); saved artifacts hold a ``CompiledForest`` and a
+compiled imputer, so ``RiskScorer.load`` does not import it either,
+unless the estimator was kept as well and ``engine`` asks for it for
+the large batches the compiled forest is slow on.
+When the artifacts hold a drift reference, every scored batch is also
+counted into a ``DriftMonitor`` (``credit_risk.drift``).
+``benchmarks/bench_import.py`` checks that the cold start stays within a
+budget.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.drift import DriftMonitor, DriftReference
+from credit_risk.forest import ENGINES, export_forest, load_tree_model
+from credit_risk.loader import load_loan_data
+from credit_risk.pipeline import FeaturePipeline, risk_target
+from credit_risk.schema import SCHEMA
+from credit_risk.segments import SegmentedModel
+from credit_risk.transforms import clean_chunk, clean_features
+
+# Everything the pipeline reads except the target
+FEATURE_SCHEMA = {column: dtype for column, dtype in SCHEMA.items() if column != "loan_status"}
+
+
+def records_to_frame(records):
+    """Return application ``records`` (dicts) as a frame typed like ``FEATURE_SCHEMA``.
+
+    Missing fields become NaN; numeric fields that do not parse raise.
+    """
+    frame = pd.DataFrame.from_records(records, columns=list(FEATURE_SCHEMA))
+    for column, dtype in FEATURE_SCHEMA.items():
+        if dtype != "category":
+            frame[column] = pd.to_numeric(frame[column]).astype(dtype)
+
+    return frame
+
+
+class RiskScorer:
+    """Fitted ``FeaturePipeline`` plus a model with ``predict_proba``."""
+
+    def __init__(self, pipeline, model, monitor=None):
+        self.pipeline = pipeline
+        self.model = model
+        self.monitor = monitor
+
+    @classmethod
+    def load(cls, directory, engine="auto"):
+        """Load artifacts written by ``save_artifacts``.
+
+        Tree models are loaded as a memory-mapped ``CompiledForest`` (or one
+        per segment, for a ``SegmentedModel``), and a saved drift reference
+        as the ``monitor``. ``engine`` picks what scores a tree model when
+        the sklearn estimator was kept too (``model.pkl``, or one pickle per
+        segment), see ``credit_risk.forest.load_tree_model``:
+
+        ``"auto"``
+            the compiled forest for batches up to ``COMPILED_MAX_BATCH``
+            rows, where it is faster, and the estimator above that;
+        ``"compiled"``
+            the compiled forest only, which keeps scikit-learn out of the
+            worker (see ``benchmarks/bench_import.py``);
+        ``"sklearn"``
+            the estimator only.
+
+        Without the estimator every engine scores with the compiled forest.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+        pipeline = FeaturePipeline.load(os.path.join(directory, "pipeline"))
+        forest_path = os.path.join(directory, "forest")
+        pickle_path = os.path.join(directory, "model.pkl")
+        if os.path.isdir(os.path.join(directory, "segments")):
+            model = SegmentedModel.load(os.path.join(directory, "segments"), engine)
+        elif os.path.isdir(forest_path):
+            model = load_tree_model(forest_path, pickle_path, engine)
+        else:
+            with open(pickle_path, "rb") as f:
+                model = pickle.load(f)
+        monitor = None
+        if os.path.exists(os.path.join(directory, "drift.npz")):
+            monitor = DriftMonitor(DriftReference.load(os.path.join(directory, "drift.npz")))
+        return cls(pipeline, model, monitor)
+
+    def score_frame(self, frame):
+        """Return P(risky) for a frame typed like ``FEATURE_SCHEMA``."""
+        features = self.pipeline.transform_matrix(clean_features(frame.copy()))
+        if self.monitor is not None:
+            self.monitor.update(features)
+        return self.model.predict_proba(features)[:, 1]
+
+    def __call__(self, records):
+        """Return P(risky) for a list of application records."""
+        if not records:
+            return np.empty(0)
+        return self.score_frame(records_to_frame(records))
+
+
+def save_artifacts(directory, pipeline, model, keep_estimator=False, reference=None):
+    """Write a fitted pipeline and model for ``RiskScorer.load``.
+
+    Tree models are exported as a ``CompiledForest`` only, unless
+    ``keep_estimator`` also pickles the sklearn estimator (which
+    ``credit_risk.incremental`` needs to add trees later). A
+    ``DriftReference`` is written as ``drift.npz``, and a ``SegmentedModel``
+    into ``segments/`` (``keep_estimator`` pickles each segment's estimator).
+    """
+    pipeline.save(os.path.join(directory, "pipeline"))
+    if reference is not None:
+        reference.save(os.path.join(directory, "drift.npz"))
+    if isinstance(model, SegmentedModel):
+        model.save(os.path.join(directory, "segments"), keep_estimator)
+        return
+    is_forest = hasattr(model, "estimators_") or hasattr(model, "tree_")
+    if is_forest:
+        export_forest(model, os.path.join(directory, "forest"))
+    if keep_estimator or not is_forest:
+        with open(os.path.join(directory, "model.pkl"), "wb") as f:
+            pickle.dump(model, f)
+
+
+def train_artifacts(path, directory, model=None, keep_estimator=False, segment_keys=None):
+    """Fit the pipeline and ``model`` on the whole extract at ``path`` and save them.
+
+    ``model`` defaults to the notebook's ``RandomForestClassifier(random_state=10)``,
+    or with ``segment_keys`` to a ``SegmentedModel`` of random forests over
+    those columns.
+    """
+    if model is None and segment_keys is None:
+        from sklearn.ensemble import RandomForestClassifier
+
+        model = RandomForestClassifier(random_state=10, n_jobs=-1)
+
+    frame = clean_chunk(load_loan_data(path))
+    pipeline = FeaturePipeline()
+    X = pipeline.fit(frame).transform_matrix(frame)
+    if segment_keys is not None:
+        model = SegmentedModel(segment_keys, pipeline.columns_)
+    model.fit(X, risk_target(frame["loan_risk_est"]))
+    reference = DriftReference.fit(X, pipeline.columns_)
+    save_artifacts(directory, pipeline, model, keep_estimator, reference)
+    return RiskScorer(pipeline, model, DriftMonitor(reference))
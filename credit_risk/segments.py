@@ -0,0 +1,286 @@
+"""Segmented models: one classifier per ``grade`` / ``term`` segment, routed at scoring.
+
+The notebook fits one random forest over all grades and both terms,
+although ``field_risk_vis`` shows the risky rate moving sharply with
+``grade``. ``SegmentedModel`` partitions the rows by the values of its
+``keys`` (columns of ``final_loan_data``, "grade" and "term" by default)
+and fits one model per segment. A global model fit on every row covers
+the segments with fewer than ``min_rows`` rows or ``min_minority`` rows
+of either class, and any segment unseen in training.
+
+All fits run in one process pool: the features, labels and the row order
+grouped by segment are written once as ``.npy`` files and memory-mapped
+by the workers, as in ``credit_risk.models``, and a task only ships the
+bounds of its segment. The global model, the largest fit, comes first
+with ``n_jobs=-1`` (every core, for the random forest); the segments
+then run one per worker with ``n_jobs=1``.
+
+``predict_proba`` routes rows in vectorized groups: the key values are
+mapped to a model number per row, the rows are sorted by it once and each
+model predicts its contiguous slice. ``save`` exports every model as a
+``CompiledForest`` (or a pickle for other model types, and for tree models
+too with ``keep_estimator``) and ``load`` reads them back with the same
+``engine`` choice as a single model, so ``RiskScorer`` can serve a
+segmented model like a single one.
+
+Usage::
+
+    python -m credit_risk.segments loan_data_2007_2014.csv --keys grade term --model rfc
+"""
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from credit_risk.forest import load_tree_model
+
+SEGMENT_KEYS = ("grade", "term")
+# Segments smaller than this, or with fewer rows of either class, use the global model
+MIN_SEGMENT_ROWS = 2_000
+MIN_MINORITY_ROWS = 200
+# Per-node arrays of a fitted sklearn tree, as _model_size counts them
+TREE_ARRAYS = ("children_left", "children_right", "feature", "threshold", "impurity",
+               "n_node_samples", "weighted_n_node_samples", "missing_go_to_left", "value")
+
+
+def _fit_part(name, params, paths, start, stop, n_jobs=1):
+    from credit_risk.models import default_models, load_shared
+
+    data = load_shared(paths)
+    rows = np.sort(data["order"][start:stop])
+    model = default_models()[name].set_params(**params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=n_jobs)
+    begin = time.perf_counter()
+    model.fit(data["X"][rows], data["y"][rows])
+    return model, time.perf_counter() - begin
+
+
+def _model_size(model):
+    """Return the bytes of ``model``: its tree node and leaf value arrays, or its pickle.
+
+    For tree models this sums the public per-node arrays of every tree
+    without serializing them; the pickle pads each node record, so it is
+    about a tenth larger.
+    """
+    if not (hasattr(model, "estimators_") or hasattr(model, "tree_")):
+        return len(pickle.dumps(model))
+    return sum(getattr(tree.tree_, name).nbytes
+               for tree in getattr(model, "estimators_", [model]) for name in TREE_ARRAYS
+               if hasattr(tree.tree_, name))
+
+
+class SegmentedModel:
+    """One model per value combination of the ``keys`` columns, plus a global fallback."""
+
+    def __init__(self, keys=SEGMENT_KEYS, columns=None, model="rfc", params=None,
+                 min_rows=MIN_SEGMENT_ROWS, min_minority=MIN_MINORITY_ROWS):
+        self.keys = list(keys)
+        self.columns = columns
+        self.model = model
+        self.params = params or {}
+        self.min_rows = min_rows
+        self.min_minority = min_minority
+
+    def _key_values(self, X):
+        positions = [list(self.columns).index(key) for key in self.keys]
+        return np.asarray(X[:, positions], dtype="float64")
+
+    def fit(self, X, y, max_workers=None):
+        """Fit the global model and every large enough segment of ``X``, ``y`` in parallel.
+
+        ``columns`` (the names of the columns of ``X``) must have been given.
+        ``y`` is 1 for risky, 0 for good. Fills ``segments_`` (one row per
+        segment: its key values, rows, risky rate, the model it uses and the
+        fit seconds and ``_model_size`` of its own model), ``models_`` (the
+        global model first) and ``classes_``.
+        """
+        from credit_risk.models import share_arrays
+
+        y = np.asarray(y)
+        values, segment = np.unique(self._key_values(X), axis=0, return_inverse=True)
+        segment = segment.ravel()
+        order = np.argsort(segment, kind="stable")
+        bounds = np.searchsorted(segment[order], np.arange(len(values) + 1))
+
+        rows = np.diff(bounds)
+        risky = np.bincount(segment, weights=y, minlength=len(values))
+        fits = (rows >= self.min_rows) & (np.minimum(risky, rows - risky) >= self.min_minority)
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = share_arrays(directory, X=X, y=y, order=order)
+            results = [_fit_part(self.model, self.params, paths, 0, len(y), n_jobs=-1)]
+            with ProcessPoolExecutor(max_workers) as executor:
+                jobs = [executor.submit(_fit_part, self.model, self.params, paths,
+                                        bounds[i], bounds[i + 1])
+                        for i in np.flatnonzero(fits)]
+                results += [job.result() for job in jobs]
+
+        self.models_ = [model for model, _ in results]
+        self.classes_ = self.models_[0].classes_
+        model_of = np.zeros(len(values), dtype=np.intp)
+        model_of[fits] = np.arange(1, fits.sum() + 1)
+        fit_s = np.array([seconds for _, seconds in results])
+        size_mb = np.array([_model_size(model) for model in self.models_]) / 2 ** 20
+
+        self.segments_ = pd.DataFrame(values, columns=self.keys)
+        self.segments_["rows"] = rows
+        self.segments_["risky_rate"] = risky / rows
+        self.segments_["model"] = model_of
+        self.segments_["fit_s"] = np.where(fits, fit_s[model_of], np.nan)
+        self.segments_["size_mb"] = np.where(fits, size_mb[model_of], np.nan)
+        self.global_fit_s_, self.global_size_mb_ = fit_s[0], size_mb[0]
+        # The routing table of route() is rebuilt from the new segments
+        self._routes = None
+        return self
+
+    def route(self, X):
+        """Return the number of the model (in ``models_``) that scores each row of ``X``."""
+        if getattr(self, "_routes", None) is None:
+            self._routes = dict(zip(map(tuple, self.segments_[self.keys].to_numpy("float64")),
+                                    self.segments_["model"]))
+        # One lookup per distinct key combination, not per row
+        values, inverse = np.unique(self._key_values(X), axis=0, return_inverse=True)
+        model_of = np.array([self._routes.get(tuple(value), 0) for value in values],
+                            dtype=np.intp)
+        return model_of[inverse.ravel()]
+
+    def predict_proba(self, X):
+        routed = self.route(X)
+        order = np.argsort(routed, kind="stable")
+        bounds = np.searchsorted(routed[order], np.arange(len(self.models_) + 1))
+        proba = np.empty((len(X), len(self.classes_)))
+        for number, model in enumerate(self.models_):
+            rows = order[bounds[number]:bounds[number + 1]]
+            if len(rows):
+                proba[rows] = model.predict_proba(X[rows])
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def save(self, directory, keep_estimator=False):
+        """Write every model (tree models as a ``CompiledForest``) and the routing table.
+
+        ``keep_estimator`` also pickles the sklearn estimator of every tree
+        model, as ``save_artifacts`` does for a single model.
+        """
+        from credit_risk.forest import export_forest
+
+        os.makedirs(directory, exist_ok=True)
+        for number, model in enumerate(self.models_):
+            is_forest = hasattr(model, "estimators_") or hasattr(model, "tree_")
+            if is_forest:
+                export_forest(model, os.path.join(directory, str(number)))
+            if keep_estimator or not is_forest:
+                with open(os.path.join(directory, f"{number}.pkl"), "wb") as f:
+                    pickle.dump(model, f)
+        self.segments_.to_csv(os.path.join(directory, "segments.csv"), index=False)
+        with open(os.path.join(directory, "segments.json"), "w") as f:
+            json.dump({"keys": self.keys, "columns": list(self.columns), "model": self.model,
+                       "n_models": len(self.models_),
+                       "classes": np.asarray(self.classes_).tolist()}, f)
+
+    @classmethod
+    def load(cls, directory, engine="auto"):
+        """Load a model written by ``save``; tree models are memory-mapped.
+
+        Every tree model is loaded with ``load_tree_model(..., engine)``.
+        """
+        with open(os.path.join(directory, "segments.json")) as f:
+            meta = json.load(f)
+        segmented = cls(meta["keys"], meta["columns"], meta["model"])
+        segmented.models_ = []
+        for number in range(meta["n_models"]):
+            path = os.path.join(directory, str(number))
+            if os.path.isdir(path):
+                segmented.models_.append(load_tree_model(path, path + ".pkl", engine))
+            else:
+                with open(path + ".pkl", "rb") as f:
+                    segmented.models_.append(pickle.load(f))
+        segmented.classes_ = np.array(meta["classes"])
+        segmented.segments_ = pd.read_csv(os.path.join(directory, "segments.csv"))
+        return segmented
+
+
+def compare_segments(X, y, columns, keys=SEGMENT_KEYS, model="rfc", params=None,
+                     min_rows=MIN_SEGMENT_ROWS, min_minority=MIN_MINORITY_ROWS,
+                     max_workers=None, random_state=0):
+    """Fit a segmented model on a train split and score it per segment on the rest.
+
+    Returns ``(segmented, table)``: ``table`` has one row per segment with
+    its validation rows and the accuracy and ROC AUC of the global model
+    and of the model the segment is routed to, plus an "all" row.
+    """
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    y = np.asarray(y)
+    train, val = train_test_split(np.arange(len(y)), random_state=random_state, stratify=y)
+    segmented = SegmentedModel(keys, columns, model, params, min_rows, min_minority)
+    segmented.fit(X[train], y[train], max_workers)
+
+    val_X, val_y = X[val], y[val]
+    proba = {"global": segmented.models_[0].predict_proba(val_X)[:, 1],
+             "segmented": segmented.predict_proba(val_X)[:, 1]}
+    key_values = segmented._key_values(val_X)
+
+    def scores(mask):
+        row = {"val_rows": int(mask.sum())}
+        for mode, p in proba.items():
+            row[f"{mode}_accuracy"] = accuracy_score(val_y[mask], p[mask] > 0.5)
+            row[f"{mode}_roc_auc"] = (roc_auc_score(val_y[mask], p[mask])
+                                      if len(np.unique(val_y[mask])) > 1 else np.nan)
+        return row
+
+    rows = []
+    for _, segment in segmented.segments_.iterrows():
+        mask = (key_values == segment[segmented.keys].to_numpy("float64")).all(axis=1)
+        row = {key: segment[key] for key in segmented.keys}
+        row.update({"train_rows": segment["rows"], "model": segment["model"]})
+        row.update(scores(mask))
+        rows.append(row)
+    row = {key: "all" for key in segmented.keys}
+    row.update({"train_rows": len(train), "model": np.nan})
+    row.update(scores(np.ones(len(val_y), dtype=bool)))
+    rows.append(row)
+    table = pd.DataFrame(rows).astype({"train_rows": "int64", "model": "Int64"})
+    return segmented, table.set_index(segmented.keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train one model per segment and compare.")
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--keys", nargs="+", default=list(SEGMENT_KEYS))
+    parser.add_argument("--model", default="rfc")
+    parser.add_argument("--min-rows", type=int, default=MIN_SEGMENT_ROWS)
+    parser.add_argument("--min-minority", type=int, default=MIN_MINORITY_ROWS)
+    parser.add_argument("--max-workers", type=int)
+    parser.add_argument("--save", help="export the segmented model to this directory")
+    args = parser.parse_args(argv)
+
+    from credit_risk.cache import load_features
+    from credit_risk.pipeline import risk_target
+
+    final_loan_data, loan_risk_est = load_features(args.path)
+    segmented, table = compare_segments(final_loan_data.to_numpy(), risk_target(loan_risk_est),
+                                        list(final_loan_data.columns), args.keys, args.model,
+                                        min_rows=args.min_rows, min_minority=args.min_minority,
+                                        max_workers=args.max_workers)
+    print(table.to_string(float_format="{:.3f}".format))
+    fitted = segmented.segments_.dropna(subset=["fit_s"])
+    print(f"\nglobal model: {segmented.global_fit_s_:.1f} s, {segmented.global_size_mb_:.1f} MB; "
+          f"{len(fitted)} segment models: {fitted['fit_s'].sum():.1f} s in total, "
+          f"{fitted['fit_s'].max():.1f} s and {fitted['size_mb'].max():.1f} MB the largest")
+    if args.save:
+        segmented.save(args.save)
+
+
+if __name__ == "__main__":
+    main()
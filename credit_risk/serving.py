@@ -0,0 +1,196 @@
+"""Online scoring of loan applications with the trained credit-risk model.
+
+``serve`` wraps a ``credit_risk.scoring.RiskScorer`` in a small asyncio
+HTTP server whose requests are micro-batched: requests arriving within
+``max_wait`` seconds of each other are scored together, up to
+``max_batch`` records. Batches are scored by the ``engine`` given to
+``RiskScorer.load``: with "auto", batches up to ``COMPILED_MAX_BATCH``
+records go to the compiled forest and larger ones to the sklearn forest,
+if the artifacts kept it (``bench_serving`` compares the engines).
+``GET /drift`` returns the drift scores of everything scored so far
+(``credit_risk.drift``).
+
+Usage::
+
+    python -m credit_risk.serving train loan_data_2007_2014.csv artifacts/
+    python -m credit_risk.serving serve artifacts/ --port 8080
+    curl -d '{"records": [{"loan_amnt": 10000, "term": " 36 months", ...}]}' \\
+        localhost:8080/score
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from credit_risk.scoring import ENGINES, RiskScorer, train_artifacts
+
+
+class MicroBatcher:
+    """Collect concurrent ``score`` calls into batches for ``scorer``.
+
+    A batch is scored as soon as it holds ``max_batch`` records or the
+    first request in it has waited ``max_wait`` seconds. Scoring runs on a
+    worker thread, so the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, scorer, max_batch=256, max_wait=0.002):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(1)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        self._executor.shutdown()
+
+    async def score(self, records):
+        """Return the risk of ``records`` once their batch has been scored."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            size += len(item[0])
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            records = [record for items, _ in batch for record in items]
+            try:
+                risk = await loop.run_in_executor(self._executor, self.scorer, records)
+            except Exception:
+                # Score the requests one by one so that only the bad ones fail
+                for items, future in batch:
+                    try:
+                        risk = await loop.run_in_executor(self._executor, self.scorer, items)
+                        future.set_result(risk.tolist())
+                    except Exception as error:
+                        future.set_exception(error)
+                continue
+
+            offset = 0
+            for items, future in batch:
+                future.set_result(risk[offset:offset + len(items)].tolist())
+                offset += len(items)
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+
+async def _dispatch(batcher, method, target, body):
+    if method == "GET" and target == "/health":
+        return 200, {"status": "ok"}
+    if method == "GET" and target == "/drift":
+        monitor = batcher.scorer.monitor
+        if monitor is None:
+            return 404, {"error": "the artifacts hold no drift reference"}
+        scores = monitor.scores()
+        return 200, {"rows": monitor.n_rows,
+                     "columns": json.loads(scores.to_json(orient="index"))}
+    if method != "POST" or target != "/score":
+        return 404, {"error": f"no route for {method} {target}"}
+
+    try:
+        payload = json.loads(body)
+        records = payload["records"] if "records" in payload else [payload]
+        return 200, {"risk": await batcher.score(records)}
+    except (ValueError, KeyError, TypeError) as error:
+        return 400, {"error": str(error)}
+
+
+async def _handle(batcher, reader, writer):
+    """Serve HTTP/1.1 requests on one (keep-alive) connection."""
+    try:
+        while request_line := await reader.readline():
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            status, payload = await _dispatch(batcher, method, target, body)
+            data = json.dumps(payload).encode()
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(scorer, host="127.0.0.1", port=8080, max_batch=256, max_wait=0.002):
+    """Serve ``POST /score``, ``GET /health`` and ``GET /drift`` until cancelled."""
+    batcher = MicroBatcher(scorer, max_batch, max_wait)
+    batcher.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle(batcher, reader, writer), host, port
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or serve the credit-risk scorer.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="fit and save scoring artifacts")
+    train.add_argument("path")
+    train.add_argument("directory")
+    train.add_argument("--keep-estimator", action="store_true",
+                       help="also pickle the sklearn model, for credit_risk.incremental")
+    train.add_argument("--segment-keys", nargs="+",
+                       help="train one model per segment of these columns (e.g. grade term)")
+
+    run = commands.add_parser("serve", help="serve saved artifacts over HTTP")
+    run.add_argument("directory")
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--port", type=int, default=8080)
+    run.add_argument("--max-batch", type=int, default=256)
+    run.add_argument("--max-wait-ms", type=float, default=2.0)
+    run.add_argument("--engine", choices=ENGINES, default="auto",
+                     help="how tree models score (see RiskScorer.load)")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        train_artifacts(args.path, args.directory, keep_estimator=args.keep_estimator,
+                        segment_keys=args.segment_keys)
+    else:
+        scorer = RiskScorer.load(args.directory, args.engine)
+        print(f"Serving on http://{args.host}:{args.port}", flush=True)
+        asyncio.run(serve(scorer, args.host, args.port, args.max_batch, args.max_wait_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
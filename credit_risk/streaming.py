@@ -0,0 +1,76 @@
+"""Out-of-core cleaning of loan extracts that do not fit in memory.
+
+The CSV is read ``chunksize`` rows at a time, every row-wise step of
+``credit_risk.transforms`` is applied to the chunk, and the result is
+appended to a Parquet file as one row group. Only one chunk is held in
+memory at any time.
+
+Usage::
+
+    python -m credit_risk.streaming loan_data_2007_2014.csv clean.parquet
+"""
+import argparse
+
+from credit_risk.loader import iter_loan_chunks
+from credit_risk.transforms import clean_chunk
+
+
+def _arrow_schema(table):
+    """Widen dictionary indices to int32 so every chunk shares one schema.
+
+    pyarrow picks the smallest index type that fits each chunk's categories,
+    which would otherwise differ from row group to row group.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+def stream_preprocess(path, out_path, chunksize=100_000, schema=None):
+    """Clean the CSV at ``path`` chunk by chunk into the Parquet file ``out_path``.
+
+    Returns a ``(rows_read, rows_written)`` tuple.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows_read = rows_written = 0
+    writer = None
+    try:
+        for chunk in iter_loan_chunks(path, chunksize, schema):
+            rows_read += len(chunk)
+            cleaned = clean_chunk(chunk)
+            table = pa.Table.from_pandas(cleaned, preserve_index=False)
+
+            if writer is None:
+                arrow_schema = _arrow_schema(table)
+                writer = pq.ParquetWriter(out_path, arrow_schema)
+
+            writer.write_table(table.cast(arrow_schema))
+            rows_written += len(cleaned)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows_read, rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean a loan extract chunk by chunk.")
+    parser.add_argument("path")
+    parser.add_argument("out_path")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    rows_read, rows_written = stream_preprocess(args.path, args.out_path, args.chunksize)
+    print(f"{rows_read} rows read, {rows_written} resolved loans written to {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Synthetic LendingClub-shaped loan extracts.
+
+The real ``loan_data_2007_2014.csv`` cannot be shipped, so benchmarks use
+this generator instead. It reproduces the column set of the original extract
+(including the all-NaN columns), the string formats the pipeline parses
+(" 36 months", "10+ years", "Mon-YY" dates) and roughly the same value mix and
+NaN rates, so every stage sees realistic cardinalities.
+
+Usage::
+
+    python -m credit_risk.synthetic loan_data_synthetic.csv --rows 1000000
+
+Rows are generated and written in chunks of ``chunk_rows``, so any size
+(10k to 10M rows and beyond) runs in bounded memory. The output depends on
+``seed`` and ``chunk_rows``. String columns are drawn as codes into small
+label tables, and the CSV is written with pyarrow when it is installed,
+which is several times faster than ``DataFrame.to_csv``.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+LOAN_STATUS = {
+    "Current": 0.480,
+    "Fully Paid": 0.396,
+    "Charged Off": 0.091,
+    "Late (31-120 days)": 0.015,
+    "In Grace Period": 0.007,
+    "Does not meet the credit policy. Status:Fully Paid": 0.004,
+    "Late (16-30 days)": 0.003,
+    "Default": 0.002,
+    "Does not meet the credit policy. Status:Charged Off": 0.002,
+}
+
+GRADES = {"A": 0.16, "B": 0.29, "C": 0.27, "D": 0.16, "E": 0.08, "F": 0.03, "G": 0.01}
+
+EMP_LENGTHS = {
+    "10+ years": 0.31, "2 years": 0.09, "3 years": 0.08, "< 1 year": 0.08,
+    "5 years": 0.07, "1 year": 0.06, "4 years": 0.06, "6 years": 0.06,
+    "7 years": 0.05, "8 years": 0.05, "9 years": 0.04, None: 0.05,
+}
+
+HOME_OWNERSHIP = {"MORTGAGE": 0.505, "RENT": 0.404, "OWN": 0.089,
+                  "OTHER": 0.0012, "NONE": 0.0004, "ANY": 0.0004}
+
+VERIFICATION_STATUS = {"Verified": 0.36, "Source Verified": 0.32, "Not Verified": 0.32}
+
+PURPOSES = {
+    "debt_consolidation": 0.588, "credit_card": 0.223, "home_improvement": 0.057,
+    "other": 0.051, "major_purchase": 0.021, "small_business": 0.015,
+    "car": 0.012, "medical": 0.010, "moving": 0.006, "vacation": 0.005,
+    "wedding": 0.005, "house": 0.005, "educational": 0.001, "renewable_energy": 0.001,
+}
+
+ADDR_STATES = [
+    "AK", "AL", "AR", "AZ", "CA", "CO", "CT", "DC", "DE", "FL", "GA", "HI",
+    "IA", "ID", "IL", "IN", "KS", "KY", "LA", "MA", "MD", "ME", "MI", "MN",
+    "MO", "MS", "MT", "NC", "NE", "NH", "NJ", "NM", "NV", "NY", "OH", "OK",
+    "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VA", "VT", "WA", "WI",
+    "WV", "WY",
+]
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+EMPTY_COLS = [
+    "annual_inc_joint", "dti_joint", "verification_status_joint",
+    "open_acc_6m", "open_il_6m", "open_il_12m", "open_il_24m",
+    "mths_since_rcnt_il", "total_bal_il", "il_util", "open_rv_12m",
+    "open_rv_24m", "max_bal_bc", "all_util", "inq_fi", "total_cu_tl",
+    "inq_last_12m",
+]
+
+
+def _labels(values):
+    return np.array(list(values), dtype=object)
+
+
+def _choice(rng, weights, n):
+    keys = list(weights)
+    p = np.array([weights[k] for k in keys], dtype=float)
+    idx = rng.choice(len(keys), size=n, p=p / p.sum())
+    return _labels(keys)[idx]
+
+
+def _mon_yy(rng, first_year, last_year, n):
+    labels = _labels(f"{month}-{year % 100:02d}"
+                     for year in range(first_year, last_year + 1) for month in MONTHS)
+    return labels[rng.integers(0, len(labels), size=n)]
+
+
+def _with_nan(rng, values, rate):
+    values = np.asarray(values, dtype=object if values.dtype.kind in "OU" else float)
+    if rate > 0:
+        values[rng.random(len(values)) < rate] = None if values.dtype == object else np.nan
+    return values
+
+
+def generate_loan_data(n_rows, seed=0, offset=0):
+    """Return a DataFrame shaped like ``loan_data_2007_2014.csv``.
+
+    Row numbers and ids start after ``offset`` rows, for chunked output.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_rows
+    row = np.arange(offset, offset + n)
+
+    grade = _choice(rng, GRADES, n)
+    grade_idx = np.searchsorted(np.array(list(GRADES)), grade.astype(str))
+    sub_grades = _labels(f"{g}{level}" for g in GRADES for level in range(1, 6))
+    sub_grade = sub_grades[grade_idx * 5 + rng.integers(0, 5, size=n)]
+
+    term_60 = rng.random(n) < 0.28 + grade_idx * 0.05
+    term = np.where(term_60, " 60 months", " 36 months").astype(object)
+    int_rate = np.round(6.0 + grade_idx * 3.4 + rng.normal(0, 1.2, n), 2).clip(5.42, 26.06)
+    loan_amnt = (np.round(rng.gamma(2.2, 6500, n) / 25) * 25).clip(500, 35000)
+    months = np.where(term_60, 60, 36)
+    r = int_rate / 1200
+    installment = np.round(loan_amnt * r / (1 - (1 + r) ** -months), 2)
+
+    # Risk rises with grade so the models have signal to find.
+    status_weights = dict(LOAN_STATUS)
+    loan_status = _choice(rng, status_weights, n)
+    resolved = ~np.isin(loan_status, ["Current", "In Grace Period"])
+    flip = resolved & (rng.random(n) < grade_idx * 0.035)
+    loan_status[flip] = "Charged Off"
+
+    annual_inc = np.round(rng.lognormal(11.0, 0.55, n), -2)
+    dti = np.round(rng.uniform(0, 35, n), 2)
+    revol_bal = np.round(rng.gamma(1.5, 11000, n))
+    open_acc = rng.poisson(11, n).clip(1, None).astype(float)
+    total_acc = open_acc + rng.poisson(14, n)
+
+    frame = pd.DataFrame({
+        "Unnamed: 0": row,
+        "id": row + 1_000_000,
+        "member_id": row + 2_000_000,
+        "loan_amnt": loan_amnt.astype(int),
+        "funded_amnt": loan_amnt.astype(int),
+        "funded_amnt_inv": np.round(loan_amnt - rng.integers(0, 4, n) * 25, 2),
+        "term": term,
+        "int_rate": int_rate,
+        "installment": installment,
+        "grade": grade,
+        "sub_grade": sub_grade,
+        "emp_title": _with_nan(rng, np.array(["Teacher", "Manager", "RN", "Owner", "Driver"],
+                                             dtype=object)[rng.integers(0, 5, n)], 0.06),
+        "emp_length": _choice(rng, EMP_LENGTHS, n),
+        "home_ownership": _choice(rng, HOME_OWNERSHIP, n),
+        "annual_inc": _with_nan(rng, annual_inc, 1e-5),
+        "verification_status": _choice(rng, VERIFICATION_STATUS, n),
+        "issue_d": _mon_yy(rng, 2007, 2014, n),
+        "loan_status": loan_status,
+        "pymnt_plan": np.where(rng.random(n) < 1e-4, "y", "n").astype(object),
+        "url": "https://www.lendingclub.com/browse/loanDetail.action?loan_id="
+               + pd.Series(row + 1_000_000).astype(str),
+        "desc": _with_nan(rng, np.full(n, "Borrower added on 12/22/11 > to consolidate",
+                                       dtype=object), 0.73),
+        "purpose": _choice(rng, PURPOSES, n),
+        "title": _with_nan(rng, np.full(n, "Debt consolidation", dtype=object), 1e-4),
+        "zip_code": _labels(f"{zip3}xx" for zip3 in range(100, 999))[rng.integers(0, 899, n)],
+        "addr_state": _labels(ADDR_STATES)[rng.integers(0, len(ADDR_STATES), n)],
+        "dti": dti,
+        "delinq_2yrs": _with_nan(rng, rng.poisson(0.28, n).astype(float), 6e-5),
+        "earliest_cr_line": _with_nan(rng, _mon_yy(rng, 1944, 2011, n), 6e-5),
+        "inq_last_6mths": _with_nan(rng, rng.poisson(0.8, n).astype(float), 6e-5),
+        "mths_since_last_delinq": _with_nan(rng, rng.integers(0, 150, n).astype(float), 0.54),
+        "mths_since_last_record": _with_nan(rng, rng.integers(0, 130, n).astype(float), 0.87),
+        "open_acc": _with_nan(rng, open_acc, 6e-5),
+        "pub_rec": _with_nan(rng, rng.poisson(0.16, n).astype(float), 6e-5),
+        "revol_bal": revol_bal,
+        "revol_util": _with_nan(rng, np.round(rng.uniform(0, 100, n), 1), 7e-4),
+        "total_acc": _with_nan(rng, total_acc, 6e-5),
+        "initial_list_status": np.where(rng.random(n) < 0.35, "w", "f").astype(object),
+        "out_prncp": np.round(np.where(resolved, 0, loan_amnt * rng.random(n)), 2),
+        "out_prncp_inv": np.round(np.where(resolved, 0, loan_amnt * rng.random(n)), 2),
+        "total_pymnt": np.round(loan_amnt * rng.uniform(0.2, 1.3, n), 2),
+        "total_pymnt_inv": np.round(loan_amnt * rng.uniform(0.2, 1.3, n), 2),
+        "total_rec_prncp": np.round(loan_amnt * rng.random(n), 2),
+        "total_rec_int": np.round(loan_amnt * rng.uniform(0, 0.4, n), 2),
+        "total_rec_late_fee": np.where(rng.random(n) < 0.02, 15.0, 0.0),
+        "recoveries": np.where(loan_status == "Charged Off", np.round(rng.gamma(1, 500, n), 2), 0.0),
+        "collection_recovery_fee": np.where(loan_status == "Charged Off",
+                                            np.round(rng.gamma(1, 50, n), 2), 0.0),
+        "last_pymnt_d": _with_nan(rng, _mon_yy(rng, 2008, 2016, n), 8e-4),
+        "last_pymnt_amnt": np.round(installment * rng.uniform(0.5, 3, n), 2),
+        "next_pymnt_d": _with_nan(rng, np.where(resolved, None, "Feb-16").astype(object), 0.0),
+        "last_credit_pull_d": _with_nan(rng, _mon_yy(rng, 2007, 2016, n), 9e-5),
+        "collections_12_mths_ex_med": _with_nan(rng, rng.poisson(0.01, n).astype(float), 3e-4),
+        "mths_since_last_major_derog": _with_nan(rng, rng.integers(0, 180, n).astype(float), 0.79),
+        "policy_code": np.ones(n, dtype=int),
+        "application_type": np.full(n, "INDIVIDUAL", dtype=object),
+        "acc_now_delinq": _with_nan(rng, rng.poisson(0.004, n).astype(float), 6e-5),
+        "tot_coll_amt": _with_nan(rng, np.where(rng.random(n) < 0.75, 0.0,
+                                                np.round(rng.gamma(1, 400, n))), 0.15),
+        "tot_cur_bal": _with_nan(rng, np.round(rng.gamma(1.2, 110000, n)), 0.15),
+        "total_rev_hi_lim": _with_nan(rng, np.round(rng.gamma(2, 15000, n)), 0.15),
+    })
+    for column in EMPTY_COLS:
+        frame[column] = np.nan
+
+    return frame
+
+
+def _write_csv(chunk, path, header):
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        chunk.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        return
+
+    with open(path, "wb" if header else "ab") as f:
+        pa_csv.write_csv(pa.Table.from_pandas(chunk, preserve_index=False), f,
+                         pa_csv.WriteOptions(include_header=header))
+
+
+def write_loan_csv(path, n_rows, seed=0, chunk_rows=200_000):
+    """Write a synthetic extract of ``n_rows`` rows to ``path`` in chunks."""
+    written = 0
+    part = 0
+    while written < n_rows:
+        rows = min(chunk_rows, n_rows - written)
+        chunk = generate_loan_data(rows, seed=seed + part, offset=written)
+        _write_csv(chunk, path, header=part == 0)
+        written += rows
+        part += 1
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic loan extract.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=466_285)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    write_loan_csv(args.path, args.rows, args.seed, args.chunk_rows)
+    print(f"Wrote {args.rows} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Row-wise cleaning steps of the notebook.
+
+Every function here looks at one row at a time, so it gives the same result
+whether it runs on the whole extract or on one chunk of it. Fitted steps
+(ordinal maps learned from the data, dummies, imputation) live elsewhere.
+"""
+import numpy as np
+import pandas as pd
+
+from credit_risk.profiling import run_stage
+from credit_risk.schema import AMBIGUOUS, EMP_LENGTH, FLAG_DTYPE, GOOD_LOAN
+
+EMP_MAP = {item: i for i, item in enumerate(EMP_LENGTH)}
+
+# "%b-%y" puts two-digit years up to 68 in the 2000s; anything after this
+# year is a 19xx credit line
+CENTURY_CUTOFF = 2023
+# Year the extract was pulled, "yr_since_last_inq" counts back from it
+INQ_REFERENCE_YEAR = 2016
+
+
+def per_category(series, func, missing):
+    """Evaluate ``func`` on the distinct values of ``series`` only.
+
+    ``func`` takes the categories as an Index and returns one result per
+    category; the results are broadcast back to the rows through the
+    category codes, with ``missing`` for NaN.
+    """
+    series = series.astype("category")
+    table = np.append(np.asarray(func(series.cat.categories)), missing)
+    # NaN has code -1, which picks the trailing missing value
+    return table[series.cat.codes.to_numpy()]
+
+
+def category_lookup(series, mapping, default):
+    """Map ``series`` through ``mapping`` once per category instead of per row.
+
+    Values missing from ``mapping`` (and NaN) become ``default``.
+    """
+    return per_category(series,
+                        lambda categories: [mapping.get(item, default) for item in categories],
+                        default)
+
+
+def filter_resolved(frame):
+    """Drop loans whose "loan_status" does not tell good from risky yet."""
+    return frame[~frame["loan_status"].isin(AMBIGUOUS)]
+
+
+def label_risk(frame):
+    """Add the "loan_risk_est" target ("good" / "risky") from "loan_status"."""
+    frame["loan_risk_est"] = pd.Categorical(
+        np.where(frame["loan_status"].isin(GOOD_LOAN), "good", "risky"),
+        categories=["good", "risky"]
+    )
+    return frame
+
+
+def map_emp_length(frame):
+    """Encode "emp_length" as 0-10 years, unknown lengths as 0."""
+    frame["emp_length"] = category_lookup(frame["emp_length"], EMP_MAP, 0).astype("int8")
+    return frame
+
+
+def parse_years(categories):
+    """Return the years of "Mon-YY" strings as a float array."""
+    return pd.to_datetime(categories, format="%b-%y").year.to_numpy(dtype="float64")
+
+
+def derive_dates(frame):
+    """Turn the "Mon-YY" credit dates into years.
+
+    "earliest_cr_line" becomes the year the line was opened and
+    "last_credit_pull_d" is replaced by "yr_since_last_inq". Both columns
+    hold a few hundred distinct months, so each one is parsed (and
+    corrected) once and the result is broadcast back to the rows.
+    """
+    def earliest_year(categories):
+        years = parse_years(categories)
+        return np.where(years > CENTURY_CUTOFF, years - 100, years)
+
+    def years_since(categories):
+        return INQ_REFERENCE_YEAR - parse_years(categories)
+
+    frame["earliest_cr_line"] = per_category(
+        frame["earliest_cr_line"], earliest_year, np.nan
+    ).astype("float32")
+    frame["yr_since_last_inq"] = per_category(
+        frame["last_credit_pull_d"], years_since, np.nan
+    ).astype("float32")
+    del frame["last_credit_pull_d"]
+    return frame
+
+
+def flag_major_derogatory(frame):
+    """Replace "mths_since_last_major_derog" by a 0/1 "major_derogatory" flag."""
+    frame["major_derogatory"] = frame["mths_since_last_major_derog"].notna().astype(FLAG_DTYPE)
+    del frame["mths_since_last_major_derog"]
+    return frame
+
+
+def parse_term(frame):
+    """Turn "term" strings like " 36 months" into the number of months."""
+    frame["term"] = category_lookup(
+        frame["term"],
+        {item: int(item.replace(" months", "")) for item in frame["term"].dropna().unique()},
+        0
+    ).astype("int8")
+    return frame
+
+
+def flag_initial_list_status(frame):
+    """Encode "initial_list_status" as 1 for "w" and 0 for "f"."""
+    frame["initial_list_status"] = (frame["initial_list_status"] == "w").astype(FLAG_DTYPE)
+    return frame
+
+
+def select_resolved(frame):
+    """Return a copy of the resolved loans, labelled, without "loan_status"."""
+    frame = label_risk(filter_resolved(frame).copy())
+    del frame["loan_status"]
+    return frame
+
+
+# Row-wise steps that derive model inputs, in order
+FEATURE_STEPS = [map_emp_length, flag_major_derogatory, derive_dates, parse_term,
+                 flag_initial_list_status]
+
+
+def clean_features(frame, profiler=None):
+    """Apply the row-wise steps that derive model inputs (not the target).
+
+    This is all that scoring needs: application records have no
+    "loan_status" to filter or label on. Each step runs as a stage of
+    ``profiler`` (see ``credit_risk.profiling``).
+    """
+    for step in FEATURE_STEPS:
+        frame = run_stage(profiler, step.__name__, step, frame)
+    return frame
+
+
+def clean_chunk(frame, profiler=None):
+    """Apply every row-wise cleaning step to ``frame`` (typed as ``SCHEMA``).
+
+    Returns a new frame holding the resolved loans only, with "loan_status"
+    replaced by "loan_risk_est" and the derived columns added.
+    """
+    frame = run_stage(profiler, "select_resolved", select_resolved, frame)
+    return clean_features(frame, profiler)
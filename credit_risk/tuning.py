@@ -0,0 +1,189 @@
+"""Stratified cross-validation and successive-halving search over model parameters.
+
+The notebook scores every classifier with its default parameters on one
+``train_test_split``. ``tune`` searches ``PARAM_GRIDS`` instead, with
+stratified k-fold CV and successive halving: every candidate is first
+scored on a small random subsample of the rows, only the best
+``1 / factor`` of them go on to a ``factor`` times larger subsample, and
+so on until the survivors are scored on every row. Most of the grid is
+thus discarded after fits on a few thousand rows, and the full-size fits
+are spent on a handful of candidates.
+
+Every (candidate, fold) fit of a rung is one task of a process pool. The
+features, labels and the row order are written once as ``.npy`` files
+and memory-mapped by the workers, as in ``credit_risk.models``; a task
+only ships its parameters and row count, and rebuilds its fold from them.
+
+Usage::
+
+    python -m credit_risk.tuning loan_data_2007_2014.csv --models dtree rfc knn
+"""
+import argparse
+import json
+import math
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+from credit_risk.cache import load_features
+from credit_risk.models import default_models, load_shared, share_arrays
+from credit_risk.pipeline import risk_target
+
+PARAM_GRIDS = {
+    "dtree": {"max_depth": [4, 8, 12, 16, None],
+              "min_samples_leaf": [1, 20, 100, 500]},
+    "rfc": {"max_depth": [8, 16, None],
+            "min_samples_leaf": [1, 5, 20],
+            "max_features": ["sqrt", 0.5]},
+    "knn": {"n_neighbors": [5, 15, 51, 151],
+            "weights": ["uniform", "distance"]},
+}
+SCORERS = ("roc_auc", "accuracy")
+
+N_SPLITS = 5
+FACTOR = 3
+# Rows of the first (smallest) rung
+MIN_ROWS = 5_000
+
+
+def rung_rows(n_rows, n_candidates, factor=FACTOR, min_rows=MIN_ROWS):
+    """Return the number of rows each rung is scored on, the last one being ``n_rows``.
+
+    There are as many rungs as it takes to get down to one candidate, but
+    none smaller than ``min_rows``.
+    """
+    n_rungs = 1 + math.ceil(math.log(max(n_candidates, 1), factor))
+    n_rungs = min(n_rungs, 1 + max(0, int(math.log(n_rows / min_rows, factor))))
+    return [int(n_rows / factor ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+
+def _score(model, X, y, scoring):
+    if scoring == "roc_auc":
+        return roc_auc_score(y, model.predict_proba(X)[:, 1])
+    return accuracy_score(y, model.predict(X))
+
+
+def _fit_fold(name, params, paths, n_rows, fold, n_splits, scoring, random_state):
+    data = load_shared(paths)
+    # The first n_rows of a shuffled order are a uniform subsample
+    rows = np.sort(data["order"][:n_rows])
+    y = data["y"][rows]
+    splits = StratifiedKFold(n_splits, shuffle=True, random_state=random_state).split(rows, y)
+    train, test = next(split for i, split in enumerate(splits) if i == fold)
+
+    model = default_models()[name].set_params(**params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    model.fit(data["X"][rows[train]], y[train])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    score = _score(model, data["X"][rows[test]], y[test], scoring)
+    return score, fit_s, time.perf_counter() - start
+
+
+def tune(X, y, models=("dtree", "rfc", "knn"), grids=None, n_splits=N_SPLITS, factor=FACTOR,
+         min_rows=MIN_ROWS, scoring="roc_auc", max_workers=None, random_state=0):
+    """Search the parameter grid of every model in ``models`` and return the results.
+
+    ``grids`` maps model names to sklearn-style parameter grids
+    (``PARAM_GRIDS`` by default). Returns ``(best, table)``: ``best`` maps
+    each model to the parameters and mean CV score of its winner, and
+    ``table`` has one row per candidate with the last rung it reached, its
+    mean and standard deviation of the fold scores there, the fits it got
+    and the seconds spent fitting and scoring it over all rungs, next to
+    "exhaustive_s", its first-rung seconds scaled linearly to all rows (a
+    rough estimate of its cost in a plain grid search).
+    """
+    if scoring not in SCORERS:
+        raise ValueError(f"scoring must be one of {SCORERS}, got {scoring!r}")
+    if grids is None:
+        grids = PARAM_GRIDS
+    y = np.asarray(y)
+    order = np.random.default_rng(random_state).permutation(len(y))
+
+    candidates = [{"model": name, "params": params, "rung": 0, "rows": 0, "fits": 0,
+                   "fit_s": 0.0, "score_s": 0.0, "exhaustive_s": np.nan,
+                   "mean_score": np.nan, "std_score": np.nan}
+                  for name in models for params in ParameterGrid(grids[name])]
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = share_arrays(directory, X=X, y=y, order=order)
+        with ProcessPoolExecutor(max_workers) as executor:
+            for name in models:
+                alive = [candidate for candidate in candidates if candidate["model"] == name]
+                sizes = rung_rows(len(y), len(alive), factor, min_rows)
+                for rung, n_rows in enumerate(sizes):
+                    futures = {(id(candidate), fold): executor.submit(
+                                   _fit_fold, name, candidate["params"], paths, n_rows, fold,
+                                   n_splits, scoring, random_state)
+                               for candidate in alive for fold in range(n_splits)}
+                    for candidate in alive:
+                        results = [futures[id(candidate), fold].result()
+                                   for fold in range(n_splits)]
+                        scores = [score for score, _, _ in results]
+                        candidate.update(rung=rung, rows=n_rows,
+                                         mean_score=np.mean(scores), std_score=np.std(scores))
+                        seconds = [fit_s + score_s for _, fit_s, score_s in results]
+                        candidate["fits"] += n_splits
+                        candidate["fit_s"] += sum(fit_s for _, fit_s, _ in results)
+                        candidate["score_s"] += sum(score_s for _, _, score_s in results)
+                        if rung == 0:
+                            # Extrapolated linearly to every row: what an
+                            # exhaustive search would have spent on it
+                            candidate["exhaustive_s"] = sum(seconds) * len(y) / n_rows
+
+                    if rung < len(sizes) - 1:
+                        alive.sort(key=lambda candidate: candidate["mean_score"], reverse=True)
+                        alive = alive[:max(1, math.ceil(len(alive) / factor))]
+
+    table = pd.DataFrame(candidates)
+    table["params"] = [json.dumps(params, sort_keys=True) for params in table["params"]]
+    table = table.sort_values(["model", "rung", "mean_score"], ascending=[True, False, False])
+    best = {}
+    for name, group in table.groupby("model", sort=False):
+        winner = group.iloc[0]
+        best[name] = {"params": json.loads(winner["params"]), "mean_score": winner["mean_score"],
+                      "std_score": winner["std_score"], "rows": int(winner["rows"])}
+    return best, table.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the classifiers with successive halving.")
+    parser.add_argument("path", nargs="?", default="loan_data_2007_2014.csv")
+    parser.add_argument("--models", nargs="+", default=["dtree", "rfc", "knn"])
+    parser.add_argument("--folds", type=int, default=N_SPLITS)
+    parser.add_argument("--factor", type=int, default=FACTOR)
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS)
+    parser.add_argument("--scoring", choices=SCORERS, default="roc_auc")
+    parser.add_argument("--max-workers", type=int)
+    parser.add_argument("--json", help="write the best parameters to this file")
+    args = parser.parse_args(argv)
+
+    final_loan_data, loan_risk_est = load_features(args.path)
+    start = time.perf_counter()
+    best, table = tune(final_loan_data.to_numpy(), risk_target(loan_risk_est), args.models,
+                       n_splits=args.folds, factor=args.factor, min_rows=args.min_rows,
+                       scoring=args.scoring, max_workers=args.max_workers)
+    elapsed = time.perf_counter() - start
+
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(table.to_string(index=False, float_format="{:.3f}".format))
+    print(f"\n{len(table)} candidates in {elapsed:.1f} s "
+          f"({(table['fit_s'] + table['score_s']).sum():.1f} s of fits and scoring; "
+          f"~{table['exhaustive_s'].sum():.0f} s estimated for an exhaustive grid)")
+    for name, result in best.items():
+        print(f"best {name}: {result['params']} {args.scoring}={result['mean_score']:.4f} "
+              f"(+/- {result['std_score']:.4f}, {result['rows']} rows)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(best, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()